@@ -0,0 +1,67 @@
+"""
+Поиск по полнотекстовому индексу SQLite FTS5 вместо LIKE '%...%' по всей таблице.
+
+FTS5SearchFilter подключается в filter_backends вместо filters.SearchFilter. Представление
+указывает таблицу индекса в search_fts_table (см. миграцию
+db_train_alternative/0002_author_indexes_fts). Таблица использует токенизатор trigram,
+поэтому поиск, как и icontains, находит любую подстроку без учёта регистра, но по индексу.
+
+Если таблицы нет (другая СУБД, SQLite без FTS5), поле search_fields задано с префиксом
+(^, =, @, $) или через связь, а также для слов короче 3 символов (trigram их не индексирует)
+используется обычный поиск SearchFilter.
+"""
+import operator
+from functools import reduce
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+TRIGRAM_MIN_LENGTH = 3
+
+_available = {}
+
+
+def fts_table_available(alias, table):
+    """Есть ли в БД alias таблица FTS5 table вместе с триггерами синхронизации (результат кэшируется)"""
+    key = (alias, table)
+    if key not in _available:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            _available[key] = False
+        else:
+            # Пересоздание таблицы миграцией (ALTER в SQLite) удаляет триггеры - тогда индекс устаревает
+            names = [table, f"{table}_ai", f"{table}_ad", f"{table}_au"]
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", names)
+                _available[key] = cursor.fetchone()[0] == len(names)
+    return _available[key]
+
+
+def fts_phrase(term):
+    """Слово поиска как фраза FTS5: в кавычках, чтобы символы вроде @ . - не разбирались как синтаксис"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+class FTS5SearchFilter(filters.SearchFilter):
+
+    def filter_queryset(self, request, queryset, view):
+        table = getattr(view, 'search_fts_table', None)
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if (not table or not search_fields or not search_terms
+                or any(not field.isidentifier() or '__' in field for field in search_fields)
+                or not fts_table_available(queryset.db, table)):
+            return super().filter_queryset(request, queryset, view)
+
+        columns = ' '.join(search_fields)
+        for term in search_terms:
+            if len(term) >= TRIGRAM_MIN_LENGTH:
+                match = f"{{{columns}}} : {fts_phrase(term)}"
+                queryset = queryset.filter(
+                    pk__in=RawSQL(f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s', (match,)))
+            else:
+                queryset = queryset.filter(
+                    reduce(operator.or_, (Q(**{f"{field}__icontains": term}) for field in search_fields)))
+        return queryset
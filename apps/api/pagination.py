@@ -0,0 +1,96 @@
+"""
+Постраничный вывод для AuthorViewSet.
+
+Два режима:
+- по номеру страницы (?page=N, как раньше). С ?count=0 не выполняется COUNT(*):
+  выбирается на одну запись больше размера страницы, чтобы понять, есть ли следующая;
+- по курсору (?cursor=, пустое значение - первая страница). Используется keyset-пагинация
+  (apps.app.pagination.KeysetPaginator) по составному ключу (поле сортировки, id) без COUNT(*)
+  и OFFSET, поэтому любая страница выбирается за одинаковое время. Поле сортировки берётся
+  из параметра ?ordering= (одно из разрешённых ordering_fields представления). Сортировка
+  по нескольким полям в этом режиме не поддерживается - ответ 400, а не молча первое поле.
+"""
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from apps.app.pagination import KeysetPaginator, InvalidCursor
+
+
+class AuthorPagination(PageNumberPagination):
+    page_size = 5  # количество объектов на странице
+    page_size_query_param = 'page_size'  # параметр запроса для настройки количества объектов на странице
+    max_page_size = 1000  # максимальное количество объектов на странице
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'  # ?count=0 - без общего количества объектов
+    default_ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = 'page'
+        if self.cursor_query_param in request.query_params:
+            self.mode = 'cursor'
+            return self.paginate_by_cursor(queryset, request, view)
+        if request.query_params.get(self.count_query_param) in ('0', 'false'):
+            self.mode = 'no_count'
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.mode == 'page':
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['required'] = ['results']
+        return response_schema
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            page_number = int(request.query_params.get(self.page_query_param, 1))
+            if page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound("Некорректный номер страницы")
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        url = self.request.build_absolute_uri()
+        self.next_link = (replace_query_param(url, self.page_query_param, page_number + 1)
+                          if len(rows) > page_size else None)
+        self.previous_link = None
+        if page_number > 1:
+            self.previous_link = (remove_query_param(url, self.page_query_param) if page_number == 2
+                                  else replace_query_param(url, self.page_query_param, page_number - 1))
+        return rows[:page_size]
+
+    def paginate_by_cursor(self, queryset, request, view):
+        paginator = KeysetPaginator(queryset, self.get_page_size(request), self.get_cursor_ordering(request, view))
+        try:
+            page = paginator.page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        url = self.request.build_absolute_uri()
+        self.next_link = replace_query_param(url, self.cursor_query_param, page.next_cursor) \
+            if page.has_next() else None
+        self.previous_link = replace_query_param(url, self.cursor_query_param, page.previous_cursor) \
+            if page.has_previous() else None
+        return list(page)
+
+    def get_cursor_ordering(self, request, view):
+        """Поле сортировки для курсора из ?ordering=, если оно разрешено представлением"""
+        ordering = OrderingFilter().get_ordering(request, view.get_queryset(), view) if view else None
+        if not ordering:
+            return self.default_ordering
+        if len(ordering) > 1:
+            raise ValidationError({'ordering': "С ?cursor= можно сортировать только по одному полю"})
+        return ordering[0]
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from apps.db_train_alternative.models import Author
 
 
@@ -22,7 +23,88 @@ class AuthorSerializer(serializers.Serializer):
         instance.save()
         return instance
 
+class AuthorListSerializer(serializers.ListSerializer):
+    """
+    Пакетные операции для AuthorModelSerializer(many=True):
+    create - один bulk_create на весь список, update - один bulk_update.
+    Для update в instance передаётся словарь {id: Author}, а каждый элемент данных содержит id.
+    Уникальность email проверяется одним запросом на весь список (а не запросом на каждый элемент)
+    и с учётом повторов внутри самого списка. Ошибки возвращаются списком по элементам.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        email = self.child.fields['email']
+        email.validators = [validator for validator in email.validators if not isinstance(validator, UniqueValidator)]
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        try:
+            pk = serializers.IntegerField().run_validation(data['id'])  # Как у поля: true/false и 1.5 не id
+        except (TypeError, KeyError, serializers.ValidationError):
+            raise serializers.ValidationError({'id': ['Укажите id автора']})
+        if pk not in self.instance:
+            raise serializers.ValidationError({'id': [f'Автор с id={pk} не найден']})
+        self.child.instance = self.instance[pk]
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        validated['id'] = pk
+        return validated
+
+    def to_internal_value(self, data):
+        unique_errors = self.validate_unique_emails(data) if isinstance(data, list) else {}
+        try:
+            validated = super().to_internal_value(data)
+        except serializers.ValidationError as exc:
+            if not unique_errors or not isinstance(exc.detail, list):
+                raise
+            errors = exc.detail
+        else:
+            if not unique_errors:
+                return validated
+            errors = [{} for _ in validated]
+        for index, message in unique_errors.items():
+            errors[index].setdefault('email', []).append(message)
+        raise serializers.ValidationError(errors)
+
+    def validate_unique_emails(self, data):
+        """Ошибки уникальности email по номерам элементов: повтор в списке или занят другим автором"""
+        items = {}
+        for index, item in enumerate(data):
+            if isinstance(item, dict) and isinstance(item.get('email'), str):
+                items[index] = (item['email'].strip(), item.get('id') if self.instance is not None else None)
+        owners = dict(Author.objects.filter(email__in={email for email, _ in items.values()})
+                      .values_list('email', 'id'))
+        errors = {}
+        seen = set()
+        for index, (email, pk) in items.items():
+            if email in seen:
+                errors[index] = 'Этот email повторяется в списке'
+            elif email in owners and str(owners[email]) != str(pk):
+                errors[index] = 'Автор с таким email уже существует'
+            seen.add(email)
+        return errors
+
+    def create(self, validated_data):
+        return Author.objects.bulk_create([Author(**attrs) for attrs in validated_data])
+
+    def update(self, instance, validated_data):
+        authors = []
+        fields = set()
+        for attrs in validated_data:
+            author = instance[attrs.pop('id')]
+            for field, value in attrs.items():
+                setattr(author, field, value)
+            fields.update(attrs)
+            authors.append(author)
+        if fields:
+            Author.objects.bulk_update(authors, fields)
+        return authors
+
+
 class AuthorModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Author
-        fields = ['id', 'name', 'email']  # или можно прописать '__all__' если нужны все поля
\ No newline at end of file
+        fields = ['id', 'name', 'email']  # или можно прописать '__all__' если нужны все поля
+        list_serializer_class = AuthorListSerializer  # Используется при many=True (пакетные операции)
\ No newline at end of file
@@ -1,3 +1,207 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from apps.db_train_alternative.models import Author
+from . import filters
+from .views import AuthorViewSet
+
+BULK_URL = reverse('authors-viewset-bulk')
+LIST_URL = reverse('authors-viewset-list')
+
+
+class AuthorBulkTests(APITestCase):
+    """Пакетные операции authors_viewset/bulk/ (см. AuthorListSerializer и AuthorViewSet.bulk)"""
+
+    def setUp(self):
+        self.ann = Author.objects.create(name="ann", email="ann@example.com")
+        self.bob = Author.objects.create(name="bob", email="bob@example.com")
+
+    def test_create(self):
+        response = self.client.post(BULK_URL, [{"name": "kate", "email": "kate@example.com"},
+                                               {"name": "max", "email": "max@example.com"}], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['name'] for item in response.data], ["kate", "max"])
+        self.assertEqual(Author.objects.filter(email__in=["kate@example.com", "max@example.com"]).count(), 2)
+
+    def test_create_errors_by_index(self):
+        response = self.client.post(BULK_URL, [{"name": "kate", "email": "kate@example.com"},
+                                               {"name": "max", "email": "не email"},
+                                               {"email": "lee@example.com"}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(list(response.data[1]), ['email'])
+        self.assertEqual(list(response.data[2]), ['name'])
+        self.assertEqual(Author.objects.count(), 2)  # Ни один не создан
+
+    def test_create_duplicate_emails(self):
+        response = self.client.post(BULK_URL, [{"name": "kate", "email": "kate@example.com"},
+                                               {"name": "kate2", "email": "kate@example.com"},
+                                               {"name": "ann2", "email": "ann@example.com"}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1], {'email': ['Этот email повторяется в списке']})
+        self.assertEqual(response.data[2], {'email': ['Автор с таким email уже существует']})
+        self.assertEqual(Author.objects.count(), 2)
+
+    def test_update(self):
+        response = self.client.patch(BULK_URL, [{"id": self.ann.id, "name": "anna"},
+                                                {"id": self.bob.id, "email": "robert@example.com"}], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.ann.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.ann.name, self.ann.email), ("anna", "ann@example.com"))
+        self.assertEqual((self.bob.name, self.bob.email), ("bob", "robert@example.com"))
+
+    def test_update_duplicate_emails(self):
+        # Свой email - не повтор, занятый другим автором или повторённый в списке - ошибка
+        lee = Author.objects.create(name="lee", email="lee@example.com")
+        response = self.client.patch(BULK_URL, [{"id": self.ann.id, "email": "ann@example.com"},
+                                                {"id": self.bob.id, "email": "lee@example.com"}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [{}, {'email': ['Автор с таким email уже существует']}])
+
+        response = self.client.patch(BULK_URL, [{"id": self.ann.id, "email": "new@example.com"},
+                                                {"id": lee.id, "email": "new@example.com"}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[1], {'email': ['Этот email повторяется в списке']})
+        self.assertEqual(Author.objects.filter(email="new@example.com").count(), 0)
+
+    def test_update_unknown_ids(self):
+        response = self.client.patch(BULK_URL, [{"id": self.ann.id, "name": "anna"},
+                                                {"id": 999, "name": "nobody"},
+                                                {"name": "no id"},
+                                                {"id": True, "name": "bool"}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[1], {'id': ['Автор с id=999 не найден']})
+        self.assertEqual(response.data[2], {'id': ['Укажите id автора']})
+        self.assertEqual(response.data[3], {'id': ['Укажите id автора']})
+        self.ann.refresh_from_db()
+        self.assertEqual(self.ann.name, "ann")
+
+    def test_delete(self):
+        response = self.client.delete(BULK_URL, {"ids": [self.ann.id, 999]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'deleted': [self.ann.id], 'not_found': [999]})
+        self.assertEqual(list(Author.objects.values_list('id', flat=True)), [self.bob.id])
+
+    def test_delete_invalid_ids(self):
+        for data in [{"ids": [True]}, {"ids": []}, {"ids": "1"}, {"ids": [1.5]}, [self.ann.id], {}]:
+            with self.subTest(data=data):
+                response = self.client.delete(BULK_URL, data, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Author.objects.count(), 2)
+
+
+class AuthorPaginationTests(APITestCase):
+    """Постраничный вывод AuthorViewSet: ?cursor= и ?count=0 (см. pagination.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Повторяющиеся имена: порядок внутри одинаковых значений задаёт id
+        Author.objects.bulk_create([Author(name=f"author{number % 4}", email=f"author{number}@example.com")
+                                    for number in range(13)])
+
+    def walk(self, params):
+        pages = []
+        url = LIST_URL
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url, params = response.data['next'], None
+        return pages
+
+    def test_cursor_walk(self):
+        pages = self.walk({'cursor': '', 'page_size': 5})
+        ids = [item['id'] for page in pages for item in page['results']]
+        self.assertEqual(ids, list(Author.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual([len(page['results']) for page in pages], [5, 5, 3])
+        self.assertEqual(set(pages[0]), {'next', 'previous', 'results'})
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual([item['id'] for item in response.data['results']], ids[5:10])
+
+    def test_cursor_with_ordering(self):
+        for ordering, expected in [('name', Author.objects.order_by('name', 'id')),
+                                   ('-name', Author.objects.order_by('-name', '-id'))]:
+            with self.subTest(ordering=ordering):
+                pages = self.walk({'cursor': '', 'page_size': 4, 'ordering': ordering})
+                self.assertEqual([item['id'] for page in pages for item in page['results']],
+                                 list(expected.values_list('id', flat=True)))
+
+    def test_cursor_with_several_ordering_fields(self):
+        response = self.client.get(LIST_URL, {'cursor': '', 'ordering': 'name,-email'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+        # Неразрешённые поля OrderingFilter отбрасывает, остаётся одно - это не ошибка
+        response = self.client.get(LIST_URL, {'cursor': '', 'ordering': 'name,password'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_cursor(self):
+        for cursor in ['abc', 'eyJ2IjoiYWJjIiwiaSI6MX0']:  # Второй - {"v":"abc","i":1}, id не число
+            with self.subTest(cursor=cursor):
+                response = self.client.get(LIST_URL, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_without_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(LIST_URL, {'count': 0, 'page_size': 5, 'page': 3})
+        self.assertEqual(set(response.data), {'next', 'previous', 'results'})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNone(response.data['next'])
+        self.assertIn('page=2', response.data['previous'])
+
+        pages = self.walk({'count': 0, 'page_size': 5})
+        self.assertEqual([len(page['results']) for page in pages], [5, 5, 3])
+        self.assertEqual(self.client.get(LIST_URL, {'count': 0, 'page': 0}).status_code, 404)
+
+
+class AuthorSearchTests(APITestCase):
+    """Поиск ?search= по индексу FTS5 trigram и запасной icontains (см. filters.py)"""
+
+    def setUp(self):
+        filters._available.clear()
+        self.addCleanup(filters._available.clear)
+        if not filters.fts_table_available('default', AuthorViewSet.search_fts_table):
+            self.skipTest("SQLite без FTS5 trigram")
+        self.ann = Author.objects.create(name="ann", email="ann.smith@example.com")
+        Author.objects.create(name="bob", email="bob@example.org")
+
+    def search(self, term):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(LIST_URL, {'search': term, 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        self.used_fts = any(' MATCH ' in query['sql'] for query in queries.captured_queries)
+        return sorted(item['name'] for item in response.data['results'])
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self.search("SMITH"), ["ann"])
+        self.assertTrue(self.used_fts)
+
+        Author.objects.bulk_create([Author(name="kate", email="kate.smith@example.com")])
+        self.assertEqual(self.search("smith@"), ["ann", "kate"])
+
+        Author.objects.filter(pk=self.ann.pk).update(email="ann.jones@example.com")
+        self.assertEqual(self.search("smith"), ["kate"])
+        self.assertEqual(self.search("jones"), ["ann"])
+
+        Author.objects.filter(name="kate").delete()
+        self.assertEqual(self.search("smith"), [])
+        self.assertEqual(self.search("example"), ["ann", "bob"])
+
+    def test_short_terms_use_icontains(self):
+        self.assertEqual(self.search("rg"), ["bob"])
+        self.assertFalse(self.used_fts)
+        self.assertEqual(self.search("rg bob"), ["bob"])  # Длинное слово - по индексу, короткое - icontains
+        self.assertTrue(self.used_fts)
+
+    def test_missing_table(self):
+        with mock.patch.object(AuthorViewSet, 'search_fts_table', 'missing_author_fts'):
+            self.assertEqual(self.search("smith"), ["ann"])
+        self.assertFalse(self.used_fts)
+        self.assertFalse(filters._available[('default', 'missing_author_fts')])
@@ -1,17 +1,19 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status,viewsets
+from rest_framework import serializers, status, viewsets
 from django.views.decorators.csrf import \
     csrf_exempt  # Чтобы post, put, patch, delete не требовали csrf токена (небезопасно)
 from apps.db_train_alternative.models import Author
 from .serializers import AuthorModelSerializer
 from django.http import Http404
+from django.db import transaction
 from rest_framework.generics import GenericAPIView
 from rest_framework.mixins import RetrieveModelMixin, ListModelMixin, CreateModelMixin, UpdateModelMixin, DestroyModelMixin
 from .serializers import AuthorModelSerializer,AuthorSerializer
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from .pagination import AuthorPagination
+from .filters import FTS5SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters,permissions,authentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -145,12 +147,6 @@ class AuthorViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post']
 
 
-class AuthorPagination(PageNumberPagination):
-    page_size = 5  # количество объектов на странице
-    page_size_query_param = 'page_size'  # параметр запроса для настройки количества объектов на странице
-    max_page_size = 1000  # максимальное количество объектов на странице
-
-
 class AuthorViewSet(ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorModelSerializer
@@ -163,10 +159,63 @@ class AuthorViewSet(ModelViewSet):
     #         queryset = queryset.filter(name__contains=name)
     #     return queryset
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['name', 'email']
+    filter_backends = [DjangoFilterBackend, FTS5SearchFilter, filters.OrderingFilter]
+    # email__iexact и email__istartswith используют индекс email без учёта регистра
+    filterset_fields = {'name': ['exact'], 'email': ['exact', 'iexact', 'istartswith']}
     search_fields = ['email']
+    search_fts_table = 'db_train_alternative_author_fts'  # Полнотекстовый индекс для FTS5SearchFilter
     ordering_fields = ['name', 'email']
+    ordering = ['id']  # Однозначный порядок по умолчанию (нужен и для постраничного вывода)
+    bulk_max_items = 1000  # Максимум элементов в одном пакетном запросе
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        POST authors_viewset/bulk/ - создать авторов из списка [{"name": ..., "email": ...}, ...].
+        Все создаются одним bulk_create в одной транзакции, либо (при ошибках) ни один.
+        """
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.bulk_max_items)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        """PATCH authors_viewset/bulk/ - изменить авторов по списку [{"id": 1, "email": ...}, ...]"""
+        if not isinstance(request.data, list):
+            return Response({'message': 'Ожидается список авторов'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = []
+        for item in request.data:
+            try:
+                ids.append(int(item['id']))
+            except (TypeError, KeyError, ValueError):
+                pass  # Ошибку для такого элемента вернёт сериализатор
+        with transaction.atomic():
+            # select_for_update: параллельный запрос не изменит авторов между проверкой и записью
+            authors = Author.objects.select_for_update().in_bulk(ids)
+            serializer = self.get_serializer(authors, data=request.data, many=True, partial=True,
+                                             max_length=self.bulk_max_items)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            serializer.save()
+        return Response(serializer.data)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        """DELETE authors_viewset/bulk/ с телом {"ids": [1, 2, 3]} - удалить авторов одним запросом"""
+        ids_field = serializers.ListField(child=serializers.IntegerField(), min_length=1,
+                                          max_length=self.bulk_max_items)  # IntegerField не принимает true/false
+        try:
+            ids = ids_field.run_validation(request.data.get('ids') if isinstance(request.data, dict) else None)
+        except serializers.ValidationError:
+            return Response({'ids': [f'Ожидается список от 1 до {self.bulk_max_items} id авторов']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            found = set(Author.objects.filter(id__in=ids).values_list('id', flat=True))
+            Author.objects.filter(id__in=found).delete()
+        return Response({'deleted': sorted(found), 'not_found': [pk for pk in ids if pk not in found]})
 
 
         # ...
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Blog, Entry, UserProfile, AuthorProfile, Tag, Comment
 from django.apps import apps
+from .counters import batch_comment_counts
 
 app = apps.get_app_config('app')
 app.verbose_name = 'Приложение'  # Чтобы изменить название при отображении в админ панели (другой вариант приведен в apps.py)
@@ -10,4 +11,12 @@ admin.site.register(Entry)
 admin.site.register(UserProfile)
 admin.site.register(AuthorProfile)
 admin.site.register(Tag)
-admin.site.register(Comment)
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    def delete_queryset(self, request, queryset):
+        # Действие "Удалить выбранные": post_delete каждого комментария меняет счётчик статьи,
+        # внутри batch_comment_counts изменения записываются одним UPDATE на приращение
+        with batch_comment_counts():
+            super().delete_queryset(request, queryset)
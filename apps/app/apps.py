@@ -5,3 +5,6 @@ class DbConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.app'
     # verbose_name = "Приложение"  # Чтобы изменить название при отображении в админ панели (другой вариант приведен в admin.py)
+
+    def ready(self):
+        from . import signals  # noqa: F401 - подключение обработчиков сигналов
@@ -0,0 +1,65 @@
+"""
+Построение дерева комментариев статьи.
+
+Все комментарии статьи вместе с пользователем и его профилем (аватар) загружаются
+одним запросом, а дерево родитель -> ответы собирается в Python за O(n).
+Так шаблону не нужно вызывать comment.children.all и comment.user.user_profile
+для каждого комментария (N+1 запросов).
+"""
+from django.core.paginator import Paginator
+
+from .models import Comment
+
+
+def build_comment_tree(entry):
+    """
+    Вернуть список корневых комментариев статьи. У каждого комментария
+    заполнены атрибуты replies (список ответов в порядке создания) и
+    depth (уровень вложенности, у корневых 0). Глубина вложенности не ограничена.
+    """
+    comments = list(Comment.objects.filter(entry=entry)
+                    .select_related('user__user_profile')
+                    .order_by('created_at', 'id'))
+
+    by_id = {comment.id: comment for comment in comments}
+    roots = []
+    for comment in comments:
+        comment.replies = []
+    for comment in comments:
+        parent = by_id.get(comment.parent_id)
+        if parent is None:
+            # Корневой комментарий (или ответ на комментарий другой статьи)
+            roots.append(comment)
+        else:
+            parent.replies.append(comment)
+
+    # Уровни вложенности проставляем обходом в глубину без рекурсии
+    stack = [(root, 0) for root in roots]
+    while stack:
+        comment, depth = stack.pop()
+        comment.depth = depth
+        stack.extend((reply, depth + 1) for reply in comment.replies)
+    return roots
+
+
+def flatten_thread(root):
+    """
+    Ветка обсуждения в порядке вывода (комментарий, затем его ответы)
+    в виде плоского списка - для вывода в шаблоне без рекурсии.
+    """
+    result = []
+    stack = [root]
+    while stack:
+        comment = stack.pop()
+        result.append(comment)
+        stack.extend(reversed(comment.replies))
+    return result
+
+
+def paginate_threads(roots, page_number, per_page=10):
+    """
+    Постраничный вывод по веткам обсуждения: на странице per_page корневых
+    комментариев вместе со всеми ответами. Список уже загружен, поэтому
+    Paginator не делает запросов к БД.
+    """
+    return Paginator(roots, per_page).get_page(page_number)
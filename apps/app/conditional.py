@@ -0,0 +1,113 @@
+"""
+Условные GET запросы (ETag / Last-Modified) для страниц статьи и блога и JSON API статей.
+
+Версия страницы вычисляется одним лёгким запросом до рендеринга шаблона, поэтому при
+совпадении If-None-Match / If-Modified-Since ответ 304 отдаётся без загрузки статьи,
+комментариев и рендеринга body_text. Функции подключаются декоратором django
+condition() в views.py.
+
+В версию страницы входит всё, что в ней выводится:
+- статья: mod_date, число комментариев и время последнего изменения комментария;
+- блог: updated_at, последнее mod_date и суммарное число комментариев его опубликованных статей;
+- поколение кэша боковой панели (sidebar.get_generation) - меняется при изменении
+  любого блога, статьи или тега, в том числе набора тегов статьи;
+- пользователь (форма комментария и кнопки ответа зависят от него) и параметры запроса.
+
+JSON API (EntryJson, EntrySearchJson, декоратор responses.etag_condition): статьи - mod_date
+запрошенных статей и поколение авторов (имя пользователя, набор авторов статьи - mod_date
+при этом не меняется), поиск - только поколение боковой панели, без запросов к БД.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Q, Sum
+
+from . import sidebar
+from .generations import CacheGeneration
+from .models import Blog, Entry
+
+_authors_generation = CacheGeneration('conditional:authors:generation', sidebar.SIDEBAR_CACHE_ALIAS)
+invalidate_authors = _authors_generation.invalidate  # Изменились авторы статей (см. signals.py)
+
+
+def _state(request, key, load):
+    # etag_func и last_modified_func вызываются для одного запроса - данные загружаем один раз
+    cache = request.__dict__.setdefault('_conditional_state', {})
+    if key not in cache:
+        cache[key] = load()
+    return cache[key]
+
+
+def _etag(request, *parts):
+    user = request.user
+    raw = "|".join(str(part) for part in (*parts, sidebar.get_generation(),
+                                          user.pk if user.is_authenticated else '',
+                                          request.GET.urlencode()))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def visible_entries(request):
+    """Статьи, доступные пользователю: опубликованные, а персоналу сайта - все"""
+    return Entry.objects.all() if request.user.is_staff else Entry.published.all()
+
+
+def _post_state(request, slug):
+    return _state(request, ('post', slug), lambda: (
+        visible_entries(request).filter(slug_headline=slug)
+        .annotate(last_comment=Max('comments__updated_at'))
+        .values('id', 'mod_date', 'number_of_comments', 'last_comment')
+        .first()))
+
+
+def post_detail_etag(request, slug, *args, **kwargs):
+    state = _post_state(request, slug)
+    if state is None:
+        return None  # Страница 404 - без условного ответа
+    return _etag(request, 'post', state['id'], state['mod_date'].isoformat(),
+                 state['number_of_comments'], state['last_comment'])
+
+
+def post_detail_last_modified(request, slug, *args, **kwargs):
+    state = _post_state(request, slug)
+    if state is None:
+        return None
+    return max(filter(None, (state['mod_date'], state['last_comment'])))
+
+
+def _blog_state(request, name):
+    published = Q(entryes__status=Entry.PUBLISHED)
+    return _state(request, ('blog', name), lambda: (
+        Blog.objects.filter(slug_name=name)
+        .annotate(last_entry=Max('entryes__mod_date', filter=published),
+                  entries=Count('entryes', filter=published),
+                  comments=Sum('entryes__number_of_comments', filter=published))
+        .values('id', 'updated_at', 'last_entry', 'entries', 'comments')
+        .first()))
+
+
+def blog_etag(request, name, *args, **kwargs):
+    state = _blog_state(request, name)
+    if state is None:
+        return None
+    return _etag(request, 'blog', state['id'], state['updated_at'].isoformat(), state['last_entry'],
+                 state['entries'], state['comments'])
+
+
+def blog_last_modified(request, name, *args, **kwargs):
+    state = _blog_state(request, name)
+    if state is None:
+        return None
+    return max(filter(None, (state['updated_at'], state['last_entry'])))
+
+
+def entries_json_etag(request, ids):
+    """ETag ответа EntryJson со статьями ids: один запрос по первичному ключу без загрузки статей"""
+    versions = Entry.objects.filter(id__in=ids).order_by('id').values_list('id', 'mod_date')
+    if not versions:
+        return None  # Ни одной статьи - ответ 404 или пустой список без условного ответа
+    return _etag(request, 'entries', _authors_generation.get(),
+                 *(f"{pk}:{mod_date.isoformat()}" for pk, mod_date in versions))
+
+
+def search_json_etag(request, *args, **kwargs):
+    # Индекс поиска меняется вместе со статьями, а с ними и поколение боковой панели
+    return _etag(request, 'search')
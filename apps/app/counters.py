@@ -0,0 +1,61 @@
+"""
+Поддержка денормализованного счётчика Entry.number_of_comments.
+
+Счётчик меняется атомарно выражением F() (UPDATE ... SET n = n + 1) в той же
+транзакции, что и создание/удаление комментария, поэтому параллельные запросы
+не теряют изменения. Для массовых операций (удаление выбранных комментариев
+в админ панели, см. admin.py) есть batch_comment_counts(): внутри блока приращения
+копятся в памяти и перед фиксацией транзакции записываются одним UPDATE на каждое
+различное приращение.
+Полный пересчёт - команда `python manage.py recount_comments`.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Entry
+
+_local = threading.local()
+
+
+def change_comment_count(entry_id, delta):
+    """Изменить счётчик комментариев статьи на delta"""
+    if entry_id is None or not delta:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending[entry_id] += delta
+        return
+    Entry.objects.filter(pk=entry_id).update(number_of_comments=F('number_of_comments') + delta)
+
+
+def _flush(pending):
+    entries_by_delta = defaultdict(list)
+    for entry_id, delta in pending.items():
+        if delta:
+            entries_by_delta[delta].append(entry_id)
+    for delta, entry_ids in entries_by_delta.items():
+        Entry.objects.filter(pk__in=entry_ids).update(number_of_comments=F('number_of_comments') + delta)
+    pending.clear()
+
+
+@contextmanager
+def batch_comment_counts():
+    """
+    Транзакция, внутри которой изменения счётчиков накапливаются и записываются
+    перед её фиксацией. При исключении откатываются и комментарии, и счётчики.
+    Вложенный блок работает в рамках внешнего.
+    """
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = defaultdict(int)
+    try:
+        with transaction.atomic():
+            yield
+            _flush(_local.pending)
+    finally:
+        _local.pending = None
@@ -0,0 +1,32 @@
+"""
+Инвалидация кэша через "поколение": ключи данных содержат номер поколения, а при
+изменении исходных данных поколение меняется, и старые ключи просто перестают
+читаться и вытесняются по TIMEOUT. Используется боковой панелью (sidebar.py)
+и ответами страницы тренировки запросов (apps/db_train/analytics.py).
+"""
+import time
+
+from django.core.cache import caches
+
+
+class CacheGeneration:
+    """Номер поколения в кэше alias под ключом key"""
+
+    def __init__(self, key, alias='default'):
+        self.key = key
+        self.alias = alias
+
+    def get(self):
+        """Текущее поколение кэша, при отсутствии создаётся новое"""
+        cache = caches[self.alias]
+        generation = cache.get(self.key)
+        if generation is None:
+            cache.add(self.key, time.time_ns(), timeout=None)
+            generation = cache.get(self.key)
+        return generation
+
+    def invalidate(self):
+        """Сбросить все данные этого поколения (сменой поколения)"""
+        # Время, а не счётчик: если ключ поколения был вытеснен, новое значение
+        # не совпадёт ни с одним из прошлых и старые данные не "оживут"
+        caches[self.alias].set(self.key, time.time_ns(), timeout=None)
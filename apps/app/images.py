@@ -0,0 +1,251 @@
+"""
+Обработка картинок вне цикла запрос-ответ.
+
+Аватары (UserProfile.avatar): при загрузке нового файла считается sha256 его
+содержимого, и только если он изменился, в пуле потоков генерируются
+квадратные копии размеров AVATAR_SIZES в исходном формате и в WebP. Имена копий
+содержат хэш (avatars/variants/<hash>_<size>.webp), поэтому содержимое по имени
+никогда не меняется и браузер может кэшировать их бессрочно. Когда копии готовы,
+хэш записывается в UserProfile.avatar_variants_hash (см. models.build_avatar_variants).
+Размер пула задаётся настройкой IMAGE_WORKERS (0 - обработка сразу, без пула).
+
+Картинки статей (Entry.image) - ленивые копии разной ширины для srcset, см. ниже.
+"""
+import hashlib
+import io
+import logging
+import os
+import posixpath
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+AVATAR_SIZES = (48, 100, 200)
+AVATAR_VARIANTS_DIR = 'avatars/variants'
+DEFAULT_AVATAR = 'avatars/unnamed.png'
+
+_executor = None
+
+
+def file_hash(fieldfile):
+    """sha256 содержимого файла поля (ещё не сохранённого загруженного или уже лежащего в хранилище)"""
+    digest = hashlib.sha256()
+    if fieldfile._committed:
+        with fieldfile.storage.open(fieldfile.name, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+    else:
+        for chunk in fieldfile.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def submit(func, *args):
+    """Выполнить задачу в пуле потоков обработки картинок"""
+    global _executor
+    workers = getattr(settings, 'IMAGE_WORKERS', 2)
+    if not workers:
+        return _run(func, *args)
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='images')
+    return _executor.submit(_run, func, *args)
+
+
+def _run(func, *args):
+    try:
+        return func(*args)
+    except Exception:
+        # Ошибка обработки не должна ронять поток пула, оригинал картинки остаётся доступен
+        logger.exception("Ошибка обработки картинки %s", args)
+
+
+def _encode(image, fmt):
+    """Сохранить картинку PIL в байты в формате fmt"""
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    options = {'quality': 85, 'optimize': True} if fmt in ('JPEG', 'WEBP') else {'optimize': True}
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def _open(name, storage=default_storage):
+    with storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    return ImageOps.exif_transpose(image)  # Учитываем поворот из EXIF (фото с телефонов)
+
+
+def avatar_variant_name(digest, size, ext):
+    return f"{AVATAR_VARIANTS_DIR}/{digest}_{size}.{ext}"
+
+
+def _avatar_base_format(image):
+    # С прозрачностью - PNG, иначе JPEG
+    return ('PNG', 'png') if 'A' in image.getbands() or image.mode == 'P' else ('JPEG', 'jpg')
+
+
+def generate_avatar_variants(name, digest, storage=default_storage):
+    """Создать квадратные копии аватара всех размеров AVATAR_SIZES в исходном формате и WebP"""
+    image = _open(name, storage)
+    base_format = _avatar_base_format(image)
+    for size in AVATAR_SIZES:
+        thumb = None
+        for fmt, ext in (base_format, ('WEBP', 'webp')):
+            variant = avatar_variant_name(digest, size, ext)
+            if storage.exists(variant):
+                continue
+            if thumb is None:
+                thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            storage.save(variant, ContentFile(_encode(thumb, fmt)))
+
+
+def avatar_url(profile, size=100):
+    """
+    URL WebP копии аватара ближайшего размера не меньше size. Готовность копий берётся из
+    профиля (avatar_variants_hash), поэтому при выводе хранилище не опрашивается.
+    Пока копии не готовы (или профиля нет) - URL оригинала/аватара по умолчанию.
+    """
+    if not profile or not getattr(profile, 'avatar', None):
+        return default_storage.url(DEFAULT_AVATAR)
+    if profile.avatar_hash and profile.avatar_variants_hash == profile.avatar_hash:
+        size = next((item for item in AVATAR_SIZES if item >= int(size)), AVATAR_SIZES[-1])
+        return profile.avatar.storage.url(avatar_variant_name(profile.avatar_hash, size, 'webp'))
+    return profile.avatar.url
+
+
+# Картинки статей (Entry.image): уменьшенные копии заданной ширины создаются лениво,
+# при первом запросе (см. EntryImageThumbnailView), и хранятся в дисковом кэше
+# THUMBNAIL_CACHE_DIR/<ширина>/<имя оригинала>[.jpg] (расширение - по формату, в котором записана копия).
+# Размер кэша ограничен настройкой THUMBNAIL_CACHE_MAX_BYTES, при превышении удаляются давно
+# не запрашивавшиеся копии (LRU по mtime). Каталог сканируется только при первом промахе в процессе
+# и при вытеснении, в остальное время размер кэша считается нарастающим итогом.
+
+ENTRY_IMAGE_WIDTHS = (320, 640, 960, 1280)
+ENTRY_IMAGE_DIR = 'image_entry/'
+LRU_TOUCH_INTERVAL = 3600  # Чаще раза в час время последнего обращения к копии не обновляем
+
+_cache_bytes = None  # Размер кэша копий по оценке этого процесса, None - ещё не сканировали
+_cache_lock = threading.Lock()
+
+
+class ThumbnailNotFound(Exception):
+    """Нет оригинала или ширина/путь не разрешены"""
+    pass
+
+
+def _thumbnail_cache_dir():
+    return getattr(settings, 'THUMBNAIL_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'thumbnails'))
+
+
+def entry_thumbnail_path(name, width):
+    """
+    Путь к копии картинки статьи шириной width в дисковом кэше. Копия создаётся при
+    первом обращении. Разрешены только ширины ENTRY_IMAGE_WIDTHS и файлы из image_entry/,
+    чтобы нельзя было заполнить кэш произвольными запросами.
+    """
+    name = posixpath.normpath(name)
+    if width not in ENTRY_IMAGE_WIDTHS or not name.startswith(ENTRY_IMAGE_DIR):
+        raise ThumbnailNotFound(name)
+    fmt, ext = _thumbnail_format(name)
+    path = os.path.join(_thumbnail_cache_dir(), str(width), name)
+    if not name.lower().endswith(ext):
+        path += ext[0]  # Например, .gif записывается как JPEG - копия должна отдаваться как image/jpeg
+
+    try:
+        if time.time() - os.path.getmtime(path) > LRU_TOUCH_INTERVAL:
+            os.utime(path)  # Отмечаем обращение для вытеснения по LRU
+        return path
+    except FileNotFoundError:
+        pass
+
+    try:
+        image = _open(name)
+    except (FileNotFoundError, UnidentifiedImageError):
+        raise ThumbnailNotFound(name)
+    image.thumbnail((width, width * 10), Image.Resampling.LANCZOS)  # Ограничение только по ширине, без увеличения
+    content = _encode(image, fmt)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Запись во временный файл и атомарная замена: параллельный запрос не увидит недописанный файл
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+    enforce_thumbnail_cache_limit(len(content), keep=path)
+    return path
+
+
+def _thumbnail_format(name):
+    """Формат PIL копии и допустимые расширения её файла: PNG и WebP сохраняются как есть, остальное - в JPEG"""
+    lower = name.lower()
+    if lower.endswith('.png'):
+        return 'PNG', ('.png',)
+    if lower.endswith('.webp'):
+        return 'WEBP', ('.webp',)
+    return 'JPEG', ('.jpg', '.jpeg')
+
+
+def enforce_thumbnail_cache_limit(added=0, keep=None):
+    """
+    Учесть новую копию размером added байт и удалить давно не запрашивавшиеся копии
+    (кроме только что созданной keep), если кэш превысил THUMBNAIL_CACHE_MAX_BYTES. Весь каталог сканируется только при
+    первом вызове в процессе и когда оценка размера превысила лимит: другие процессы
+    тоже пишут в кэш, поэтому перед вытеснением размер пересчитывается точно.
+    """
+    global _cache_bytes
+    max_bytes = getattr(settings, 'THUMBNAIL_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+    with _cache_lock:
+        if _cache_bytes is not None:
+            _cache_bytes += added
+            if _cache_bytes <= max_bytes:
+                return
+        _cache_bytes = _evict_thumbnails(max_bytes, keep)
+
+
+def _evict_thumbnails(max_bytes, keep=None):
+    """Просканировать кэш, при превышении max_bytes удалить старые копии (кроме keep), вернуть итоговый размер"""
+    files = []
+    total = 0
+    for root, _, names in os.walk(_thumbnail_cache_dir()):
+        for file_name in names:
+            path = os.path.join(root, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return total
+    # Удаляем с запасом (до 90% лимита), чтобы не сканировать каталог на каждом следующем промахе
+    target = max_bytes * 0.9
+    for _, size, path in sorted(files):
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        if total <= target:
+            break
+    return total
+
+
+def entry_image_srcset(image):
+    """Значение атрибута srcset для картинки статьи: копии всех ширин ENTRY_IMAGE_WIDTHS"""
+    if not image or not image.name:
+        return ''
+    return ", ".join(f"{reverse('app:entry-thumbnail', args=(width, image.name))} {width}w"
+                     for width in ENTRY_IMAGE_WIDTHS)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from apps.app import images
+from apps.app.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Посчитать хэши аватаров и создать уменьшенные копии для профилей, у которых они ещё не готовы"
+
+    def handle(self, *args, **options):
+        processed = 0
+        for profile in (UserProfile.objects.filter(Q(avatar_hash='') | ~Q(avatar_variants_hash=F('avatar_hash')))
+                .only('id', 'avatar').iterator()):
+            try:
+                digest = images.file_hash(profile.avatar)
+            except FileNotFoundError:
+                self.stderr.write(f"Нет файла {profile.avatar.name} (профиль id={profile.id})")
+                continue
+            images.generate_avatar_variants(profile.avatar.name, digest)
+            # update(), а не save(): не меняем updated_at и не запускаем повторную обработку
+            UserProfile.objects.filter(pk=profile.pk).update(avatar_hash=digest, avatar_variants_hash=digest)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Обработано аватаров: {processed}"))
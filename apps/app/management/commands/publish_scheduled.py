@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.app.scheduler import publish_due_entries
+
+
+class Command(BaseCommand):
+    help = "Опубликовать отложенные статьи, время публикации которых наступило"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Количество статей, публикуемых одним запросом")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Проверять каждые N секунд, не завершаясь (0 - один раз)")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+        if batch_size < 1 or interval < 0:
+            raise CommandError("--batch-size должен быть положительным, --interval - не отрицательным")
+
+        while True:
+            count = publish_due_entries(batch_size)
+            if count or not interval:
+                self.stdout.write(self.style.SUCCESS(f"Опубликовано статей: {count}"))
+            if not interval:
+                break
+            close_old_connections()  # Не держим соединение с БД между проверками
+            time.sleep(interval)
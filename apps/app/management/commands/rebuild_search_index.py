@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.app import search
+
+
+class Command(BaseCommand):
+    help = "Пересобрать полнотекстовый индекс статей (после изменений в обход сигналов: update(), bulk_create)"
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            raise CommandError(f"Таблица индекса {search.SEARCH_TABLE} не найдена (нужна SQLite с FTS5 и миграции)")
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано статей: {count}"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.app.models import Comment, Entry
+
+
+class Command(BaseCommand):
+    help = "Пересчитать Entry.number_of_comments по таблице комментариев одним запросом"
+
+    def handle(self, *args, **options):
+        # Коррелированный подзапрос с агрегацией: UPDATE app_entry SET number_of_comments =
+        # COALESCE((SELECT COUNT(*) FROM app_comment WHERE entry_id = app_entry.id), 0)
+        comments = (Comment.objects.filter(entry=OuterRef('pk'))
+                    .order_by()
+                    .values('entry')
+                    .annotate(total=Count('pk'))
+                    .values('total'))
+        updated = Entry.objects.update(number_of_comments=Coalesce(Subquery(comments), 0))
+        self.stdout.write(self.style.SUCCESS(f"Счётчики комментариев пересчитаны для {updated} статей"))
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.app import rendering
+from apps.app.models import Entry
+
+
+class Command(BaseCommand):
+    help = ("Заново обработать текст статей (body_html, excerpt, время чтения) после изменения "
+            "правил обработки - статьи с render_version меньше текущей RENDER_VERSION")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Обработать все статьи, а не только устаревшие")
+        parser.add_argument('--batch-size', type=int, default=500, help="Статей в одном UPDATE")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size должен быть положительным")
+        entries = Entry.objects.all()
+        if not options['all']:
+            entries = entries.filter(render_version__lt=rendering.RENDER_VERSION)
+        # mod_date меняется вместе с выводом страницы - от него зависят ETag и Last-Modified (см. conditional.py)
+        fields = [*rendering.RENDERED_FIELDS, 'mod_date']
+
+        count = 0
+        last_id = 0
+        while True:  # Пачками по id: обновлённые статьи выпадают из выборки устаревших
+            batch = list(entries.filter(id__gt=last_id).order_by('id').only('id', 'body_text')[:batch_size])
+            if not batch:
+                break
+            now = datetime.now(timezone.utc)
+            for entry in batch:
+                rendering.render_entry(entry)
+                entry.mod_date = now
+            with transaction.atomic():
+                Entry.objects.bulk_update(batch, fields)
+            count += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Обработано статей: {count}"))
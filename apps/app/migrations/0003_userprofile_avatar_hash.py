@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_entry_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='sha256 содержимого аватара, по нему именуются уменьшенные копии', max_length=64),
+        ),
+    ]
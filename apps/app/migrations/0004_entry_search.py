@@ -0,0 +1,47 @@
+import html
+
+from django.db import migrations
+from django.db.utils import OperationalError
+from django.utils.html import strip_tags
+
+# Полнотекстовый индекс статей для поиска (см. apps/app/search.py). Хранит текст без HTML,
+# rowid = id статьи. prefix='2 3' - индекс префиксов для запросов вида "сло"*.
+SEARCH_TABLE = 'app_entry_search'
+
+
+def entry_text(value):
+    return " ".join(html.unescape(strip_tags(value or '')).split())
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return  # Поиск работает через icontains
+    Entry = apps.get_model('app', 'Entry')
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                           f"headline, summary, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+        except OperationalError:
+            return  # SQLite без FTS5
+        for pk, headline, summary, body_text in Entry.objects.values_list('pk', 'headline', 'summary',
+                                                                          'body_text').iterator():
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}(rowid, headline, summary, body) VALUES (%s, %s, %s, %s)",
+                           [pk, entry_text(headline), entry_text(summary), entry_text(body_text)])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_userprofile_avatar_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
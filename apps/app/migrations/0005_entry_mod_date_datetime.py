@@ -0,0 +1,28 @@
+# Generated by Django 4.2.9 on 2026-10-17 15:57
+
+from django.db import migrations, models
+
+
+def dates_to_datetimes(apps, schema_editor):
+    # SQLite хранит даты строкой и при смене типа колонки не преобразует их: 'YYYY-MM-DD'
+    # не читается как datetime (получился бы None), дополняем до полуночи UTC
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("UPDATE app_entry SET mod_date = mod_date || ' 00:00:00' WHERE length(mod_date) = 10")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_entry_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='entry',
+            name='mod_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(dates_to_datetimes, migrations.RunPython.noop),
+    ]
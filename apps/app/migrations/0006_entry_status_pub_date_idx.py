@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-17 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_entry_mod_date_datetime'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['status', 'pub_date'], name='app_entry_status_pub_date_idx'),
+        ),
+    ]
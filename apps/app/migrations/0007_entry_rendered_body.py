@@ -0,0 +1,209 @@
+# Generated by Django 4.2.9 on 2026-10-17 16:07
+
+import re
+from datetime import datetime, timezone
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.db import migrations, models
+from django.utils.text import slugify
+from transliterate import translit
+
+# Копия apps/app/rendering.py (версия обработки 1) на момент миграции: миграция не должна
+# зависеть от текущего кода приложения. Статьи, обработанные более старой версией,
+# пересобираются командой rerender_entries.
+RENDER_VERSION = 1
+RENDERED_FIELDS = ('body_html', 'excerpt', 'reading_time', 'render_version')
+EXCERPT_LENGTH = 300
+WORDS_PER_MINUTE = 180
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'b', 'em', 'i', 'u', 's', 'sub', 'sup',
+    'blockquote', 'pre', 'code', 'ul', 'ol', 'li', 'a', 'img', 'span', 'div', 'figure', 'figcaption',
+    'table', 'caption', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'textarea', 'select'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# Теги, между которыми в тексте (excerpt, время чтения) ставится пробел
+BLOCK_TAGS = HEADING_TAGS | {'p', 'br', 'hr', 'blockquote', 'pre', 'ul', 'ol', 'li', 'div', 'figure',
+                             'figcaption', 'table', 'caption', 'tr', 'th', 'td'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'th': {'colspan', 'rowspan'},
+    'td': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href': {'http', 'https', 'mailto'}, 'src': {'http', 'https'}}
+_CONTROL_CHARS = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def safe_url(value, schemes):
+    """Адрес, если его схема разрешена (или он относительный), иначе None"""
+    url = _CONTROL_CHARS.sub('', value)  # Браузеры игнорируют пробелы и управляющие символы: "java\tscript:"
+    scheme = urlsplit(url).scheme.lower()
+    return value.strip() if not scheme or scheme in schemes else None
+
+
+def heading_anchor(text):
+    """id заголовка: транслит текста, как у slug статей"""
+    return slugify(translit(text, 'ru', reversed=True)) or 'section'
+
+
+class _Renderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output = []
+        self.text = []
+        self.open_tags = []
+        self.drop_depth = 0  # Вложенность внутри script/style и т.п.
+        self.heading = None  # (индекс начального тега в output, текст заголовка)
+        self.anchors = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth or tag not in ALLOWED_TAGS:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        clean = {}
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = safe_url(value, URL_ATTRIBUTES[name])
+                if value is None:
+                    continue
+            clean[name] = value
+        if tag == 'img':
+            if 'src' not in clean:
+                return
+            clean.update(loading='lazy', decoding='async')
+        if tag == 'a' and urlsplit(clean.get('href', '')).scheme in ('http', 'https'):
+            clean['rel'] = 'nofollow noopener'
+
+        attributes = "".join(f' {name}="{escape(value)}"' for name, value in clean.items())
+        if tag in HEADING_TAGS and self.heading is None:
+            self.heading = (len(self.output), [])  # id добавится по тексту заголовка в handle_endtag
+        self.output.append(f'<{tag}{attributes}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(self.drop_depth - 1, 0)
+            return
+        if self.drop_depth or tag not in self.open_tags:
+            return
+        while self.open_tags:  # Закрываем и незакрытые вложенные теги
+            current = self.open_tags.pop()
+            self.output.append(f'</{current}>')
+            if current in HEADING_TAGS:
+                self._anchor_heading()
+            if current == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        self.output.append(escape(data, quote=False))
+        self.text.append(data)
+        if self.heading is not None:
+            self.heading[1].append(data)
+
+    def _anchor_heading(self):
+        if self.heading is None:
+            return
+        index, text = self.heading
+        self.heading = None
+        anchor = base = heading_anchor("".join(text))
+        number = 2
+        while anchor in self.anchors:
+            anchor = f"{base}-{number}"
+            number += 1
+        self.anchors.add(anchor)
+        self.output[index] = self.output[index][:-1] + f' id="{anchor}">'
+
+    def result(self):
+        self.close()
+        while self.open_tags:
+            self.handle_endtag(self.open_tags[-1])
+        return "".join(self.output), " ".join("".join(self.text).split())
+
+
+def render_body(body_text):
+    """Очищенный HTML и текст без разметки: (html, text)"""
+    renderer = _Renderer()
+    renderer.feed(body_text or '')
+    return renderer.result()
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Начало текста не длиннее length символов, с обрезкой по границе слова"""
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1].rsplit(' ', 1)[0] if ' ' in text[:length + 1] else text[:length]
+    return cut.rstrip(' ,.;:—-') + '…'
+
+
+def reading_time(text):
+    """Время чтения в минутах, не меньше 1 для непустого текста"""
+    words = len(text.split())
+    return max(1, round(words / WORDS_PER_MINUTE)) if words else 0
+
+
+def render_entries(apps, schema_editor):
+    # Обработка текста существующих статей. mod_date обновляется,
+    # т.к. меняется вывод страницы статьи и её ETag (см. conditional.py)
+    Entry = apps.get_model('app', 'Entry')
+    now = datetime.now(timezone.utc)
+    batch = []
+    for entry in Entry.objects.only('id', 'body_text').iterator(chunk_size=500):
+        entry.body_html, text = render_body(entry.body_text)
+        entry.excerpt = make_excerpt(text)
+        entry.reading_time = reading_time(text)
+        entry.render_version = RENDER_VERSION
+        entry.mod_date = now
+        batch.append(entry)
+        if len(batch) == 500:
+            Entry.objects.bulk_update(batch, [*RENDERED_FIELDS, 'mod_date'])
+            batch = []
+    Entry.objects.bulk_update(batch, [*RENDERED_FIELDS, 'mod_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_entry_status_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='body_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='время чтения, мин'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.9 on 2026-10-17 16:09
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from transliterate import translit
+
+SUFFIX_RESERVE = 6
+
+
+def unique_slug(queryset, field, text, max_length, fallback):
+    # Копия apps/app/slugs.py на момент миграции: миграция не должна зависеть от текущего кода приложения
+    base = (re.sub(r'[^a-zA-Z0-9_-]', '', "-".join(translit(text, 'ru', reversed=True).lower().split()))
+            or fallback)[:max_length]
+    prefix = base[:max_length - SUFFIX_RESERVE]
+    taken = set(queryset.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True))
+    number = 1
+    slug = base
+    while slug in taken:
+        number += 1
+        suffix = f"-{number}"
+        slug = base[:max_length - len(suffix)] + suffix
+    return slug
+
+
+def dedupe_slugs(apps, schema_editor):
+    # Перед уникальным индексом: у повторяющихся slug первая статья (наименьший id) сохраняет slug,
+    # остальные получают суффикс -2, -3... (их страницы и так не открывались - MultipleObjectsReturned).
+    # Пустые slug генерируются из заголовка
+    Entry = apps.get_model('app', 'Entry')
+    max_length = Entry._meta.get_field('slug_headline').max_length
+    duplicates = (Entry.objects.exclude(Q(slug_headline__isnull=True) | Q(slug_headline=''))
+                  .values('slug_headline').annotate(count=Count('id')).filter(count__gt=1)
+                  .values_list('slug_headline', flat=True))
+    for slug in list(duplicates):
+        for entry in Entry.objects.filter(slug_headline=slug).order_by('id')[1:]:
+            entry.slug_headline = unique_slug(Entry.objects.all(), 'slug_headline', slug, max_length, fallback='entry')
+            entry.save(update_fields=['slug_headline'])
+    for entry in Entry.objects.filter(Q(slug_headline__isnull=True) | Q(slug_headline='')).order_by('id'):
+        entry.slug_headline = unique_slug(Entry.objects.all(), 'slug_headline', entry.headline, max_length,
+                                          fallback='entry')
+        entry.save(update_fields=['slug_headline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_entry_rendered_body'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='entry',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='slug_name',
+            field=models.SlugField(blank=True, help_text='Название написанное транслитом, для человекочитаемости. Название уникальное. Если не указать, то конвертирует самостоятельно', unique=True, verbose_name='Slug поле названия'),
+        ),
+        migrations.RunPython(dedupe_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='entry',
+            name='slug_headline',
+            field=models.SlugField(blank=True, editable=False, help_text='Если не указать, \n        то конвертирует самостоятельно, если указать, то запишет, \n        что указали (slug значение)', max_length=255, null=True, unique=True, verbose_name='slug заголовок'),
+        ),
+    ]
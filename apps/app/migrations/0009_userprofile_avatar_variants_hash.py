@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_entry_unique_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_variants_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='sha256 аватара, для которого созданы уменьшенные копии', max_length=64),
+        ),
+    ]
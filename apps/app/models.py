@@ -1,11 +1,10 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from datetime import date, datetime, timezone
 from django.core.validators import RegexValidator
-from PIL import Image
 from django.contrib.auth.models import User
 from tinymce.models import HTMLField
-from transliterate import translit
-import re
+
+from . import images, rendering, slugs
 
 """
 Рассматриваются 4 таблицы условно обобщающие функционал блога
@@ -24,8 +23,10 @@ class Blog(models.Model):
                             help_text="Название блога уникальное. Ограничение 100 знаков")
 
     slug_name = models.SlugField(unique=True,
+                                 blank=True,
                                  verbose_name="Slug поле названия",
-                                 help_text="Название написанное транслитом, для человекочитаемости. Название уникальное.")
+                                 help_text="Название написанное транслитом, для человекочитаемости. Название уникальное. "
+                                           "Если не указать, то конвертирует самостоятельно")
 
     headline = models.TextField(max_length=255,
                                 verbose_name="Короткий слоган",
@@ -47,6 +48,12 @@ class Blog(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug_name:
+            self.slug_name = slugs.unique_slug(Blog.objects.exclude(pk=self.pk), 'slug_name', self.name,
+                                               self._meta.get_field('slug_name').max_length, fallback='blog')
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Блог"
         verbose_name_plural = "Блоги"
@@ -66,6 +73,9 @@ class UserProfile(models.Model):
     avatar - картинка профиля. Стоят задачи(просто, чтобы показать как это можно решить):
         1. При сохранении необходимо переименовать картинку по шаблону user_hash
         2. Необходимо все передаваемые картинки для аватара приводить к размеру 200х200
+           (уменьшенные копии разных размеров создаются в фоне, см. images.py)
+    avatar_hash - хэш содержимого аватара, копии создаются только при его изменении
+    avatar_variants_hash - хэш аватара, для которого копии уже созданы (равен avatar_hash, когда они готовы)
     phone_number - номер телефона с валидацией при внесении
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="user_profile")
@@ -92,6 +102,19 @@ class UserProfile(models.Model):
                             help_text="Город проживания",
                             )
 
+    avatar_hash = models.CharField(max_length=64,
+                                   blank=True,
+                                   default='',
+                                   editable=False,
+                                   help_text="sha256 содержимого аватара, по нему именуются уменьшенные копии",
+                                   )
+    avatar_variants_hash = models.CharField(max_length=64,
+                                            blank=True,
+                                            default='',
+                                            editable=False,
+                                            help_text="sha256 аватара, для которого созданы уменьшенные копии",
+                                            )
+
     created_at = models.DateTimeField(
         auto_now_add=True
     )  # Дата и время создания объекта сущности в базе данных
@@ -103,23 +126,44 @@ class UserProfile(models.Model):
     def __str__(self):
         return self.user.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'avatar' in field_names:
+            instance._loaded_avatar = instance.avatar.name  # Имя файла аватара на момент чтения из БД
+        return instance
+
     def save(self, *args, **kwargs):
-        # Пример переопределение метода save для изменения размера картинки
-        # при сохранении в БД
+        # Пример переопределения метода save: уменьшенные копии аватара (вместо изменения
+        # размера оригинала) создаются в фоне и только если изменилось содержимое файла (см. images.py)
+        loaded_avatar = getattr(self, '_loaded_avatar', None)
+        new_hash = None
+        if self.avatar and (not self.avatar._committed or self.avatar.name != loaded_avatar):
+            try:
+                new_hash = images.file_hash(self.avatar)
+            except FileNotFoundError:
+                new_hash = ''
+            if new_hash == self.avatar_hash and loaded_avatar and not self.avatar._committed:
+                # Загружен тот же самый файл - оставляем прежний и не записываем копию на диск
+                self.avatar = loaded_avatar
+                new_hash = None
+            else:
+                self.avatar_hash = new_hash
+
         # Вызов родительского save() метода
         super().save(*args, **kwargs)
+        self._loaded_avatar = self.avatar.name
 
-        # Открытие картинки
-        image = Image.open(self.avatar.path)
-
-        # Определение желаемого размера картинки
-        desired_size = (200, 200)
+        if new_hash:
+            name = self.avatar.name
+            transaction.on_commit(lambda: images.submit(build_avatar_variants, self.pk, name, new_hash))
 
-        # Изменение размера
-        image.thumbnail(desired_size, Image.ANTIALIAS)
 
-        # Сохранение картинки с перезаписью
-        image.save(self.avatar.path)
+def build_avatar_variants(profile_id, name, digest):
+    """Создать копии аватара и отметить в профиле, что они готовы (до этого avatar_url отдаёт оригинал)"""
+    images.generate_avatar_variants(name, digest)
+    # Условие на avatar_hash: если за это время загрузили другой аватар, отметка не ставится
+    UserProfile.objects.filter(pk=profile_id, avatar_hash=digest).update(avatar_variants_hash=digest)
 
 
 class AuthorProfile(models.Model):
@@ -153,10 +197,42 @@ class AuthorProfile(models.Model):
         verbose_name_plural = "Профили авторов"
 
 
-def make_slug(string):
-    # Удаление всех символов, не являющихся допустимыми для slug
-    slug = re.sub(r'[^a-zA-Z0-9_-]', '', string)
-    return slug
+class EntryQuerySet(models.QuerySet):
+    # Поля, которые выводятся только на странице статьи: в списках не загружаются (см. for_list)
+    LIST_DEFERRED_FIELDS = ('body_text', 'body_html')
+
+    def published(self):
+        return self.filter(status=Entry.PUBLISHED)
+
+    def due(self, now=None):
+        """Отложенные статьи, время публикации которых наступило (см. scheduler.py)"""
+        return self.filter(status=Entry.SCHEDULED, pub_date__lte=now or datetime.now(timezone.utc))
+
+    def for_list(self):
+        """Проекция для списков статей: без полного текста (HTML до десятков КБ на статью)"""
+        return self.defer(*self.LIST_DEFERRED_FIELDS)
+
+    def with_related(self, with_tags=True):
+        """Блог одним JOIN, авторы с пользователями и теги - по одному запросу на все статьи"""
+        authors = AuthorProfile.objects.select_related('user').only('id', 'user__id', 'user__username')
+        queryset = self.select_related('blog').prefetch_related(models.Prefetch('authors', queryset=authors))
+        if with_tags:
+            queryset = queryset.prefetch_related(models.Prefetch('tags', queryset=Tag.objects.only('id', 'name')))
+        return queryset
+
+    def feed(self, with_tags=True):
+        """
+        Статьи для ленты (главная страница, страница блога): связи как в with_related,
+        полный текст не загружается. Лента из N статей - всегда 3 запроса (2 без тегов) независимо от N.
+        """
+        return self.for_list().with_related(with_tags)
+
+
+class PublishedManager(models.Manager.from_queryset(EntryQuerySet)):
+    """Только опубликованные статьи - для публичных страниц (черновики и отложенные не выводятся)"""
+
+    def get_queryset(self):
+        return super().get_queryset().published()
 
 
 class Entry(models.Model):
@@ -168,9 +244,12 @@ class Entry(models.Model):
     headline - заголовок
     slug_headline - заголовок в транслите
     summary - краткое описание статьи
-    body_text - полный текст статьи
+    body_text - полный текст статьи (HTML из редактора)
+    body_html, excerpt, reading_time, render_version - результат обработки body_text при
+        сохранении: очищенный HTML для вывода, начало текста без разметки, время чтения
+        в минутах и версия обработки (см. rendering.py)
     pub_date - дата и время публикации записи
-    mod_date - дата редактирования записи
+    mod_date - дата и время редактирования записи
     authors - авторы написавшие данную статью (отношение "многие ко многим"
         (many-to-many). Один автор может сделать несколько записей в блог (Entry),
          и одну запись могут сделать несколько авторов (Author))
@@ -196,6 +275,7 @@ class Entry(models.Model):
                                 verbose_name="заголовок статьи")
     slug_headline = models.SlugField(null=True,
                                      blank=True,
+                                     unique=True,  # Страница статьи ищется по slug - один поиск по индексу
                                      editable=False,
                                      max_length=255,
                                      verbose_name="slug заголовок",
@@ -204,6 +284,10 @@ class Entry(models.Model):
         что указали (slug значение)""")  # Можно указать primary_key=True, тогда будет идентифицироваться в БД вместо id
     summary = models.TextField(verbose_name="краткое описание")
     body_text = HTMLField('текст статьи', default='', blank=True)
+    body_html = models.TextField(default='', blank=True, editable=False)
+    excerpt = models.TextField(default='', blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="время чтения, мин")
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False)
     image = models.ImageField(upload_to='image_entry',
                               default='image_entry/default.jpg',
                               null=True,
@@ -214,7 +298,7 @@ class Entry(models.Model):
                                     verbose_name="дата публикации")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES,
                               default=PUBLISHED, blank=True)
-    mod_date = models.DateField(auto_now=True)
+    mod_date = models.DateTimeField(auto_now=True)  # Время нужно для Last-Modified/ETag страниц статьи (conditional.py)
     authors = models.ManyToManyField(AuthorProfile,
                                      related_name="entrys",
                                      verbose_name="авторы",
@@ -227,23 +311,58 @@ class Entry(models.Model):
     rating = models.FloatField(default=0.0, blank=True)
     tags = models.ManyToManyField('Tag', verbose_name="теги статьи")
 
+    objects = EntryQuerySet.as_manager()
+    published = PublishedManager()
+
+    SLUG_ATTEMPTS = 3  # Попыток сохранения при гонке за сгенерированный slug
+
     def save(self, *args, **kwargs):
-        if self.slug_headline is None:
-            # Генерация транслитерированного slug на основе headline перед сохранением
-            slug_headline = "-".join(translit(self.headline, 'ru', reversed=True).lower().split())
-            self.slug_headline = make_slug(slug_headline)
+        generate_slug = not self.slug_headline
+        if generate_slug:
+            # Генерация транслитерированного slug на основе headline перед сохранением (см. slugs.py)
+            self.slug_headline = self._free_slug()
         if self.status in [self.SCHEDULED, self.PUBLISHED] and not self.pub_date:
             # Если запись отложена, но дата не указана, установите текущую дату
             self.pub_date = datetime.now(timezone.utc)
-
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'body_text' in update_fields:
+            # Текст обрабатывается один раз при сохранении, шаблон выводит готовый body_html
+            rendering.render_entry(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, *rendering.RENDERED_FIELDS}
+        if generate_slug and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'slug_headline'}
+
+        if not generate_slug:
+            super().save(*args, **kwargs)
+            return
+        for attempt in range(self.SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic():  # Точка сохранения: после ошибки внешняя транзакция продолжается
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Тот же slug мог успеть занять параллельный запрос - берём следующий свободный
+                taken = Entry.objects.filter(slug_headline=self.slug_headline).exclude(pk=self.pk).exists()
+                if not taken or attempt == self.SLUG_ATTEMPTS - 1:
+                    raise
+                self.slug_headline = self._free_slug()
+
+    def _free_slug(self):
+        return slugs.unique_slug(Entry.objects.exclude(pk=self.pk), 'slug_headline', self.headline,
+                                 self._meta.get_field('slug_headline').max_length, fallback='entry')
 
     def __str__(self):
         return self.headline
 
     class Meta:
-        unique_together = ('blog', 'headline', 'slug_headline')
         ordering = ('-pub_date',)  # При выводе запроса проводить сортировку по дате
+        indexes = [
+            # Постраничный вывод по ключу (pub_date, id), см. pagination.py
+            models.Index(fields=['pub_date', 'id'], name='app_entry_pub_date_id_idx'),
+            # Выборка опубликованных статей по дате и поиск отложенных к публикации, см. scheduler.py
+            models.Index(fields=['status', 'pub_date'], name='app_entry_status_pub_date_idx'),
+        ]
         permissions = [
             ("can_view_entry", "Может просматривать статью"),
             ("can_add_entry", "Может создать статью"),
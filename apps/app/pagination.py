@@ -0,0 +1,202 @@
+"""
+Постраничный вывод по ключу (keyset / cursor pagination).
+
+В отличие от django.core.paginator.Paginator не выполняет COUNT(*) и не использует
+OFFSET: следующая страница выбирается условием "строго после последней записи
+текущей страницы" по составному ключу (поле сортировки, id), записанным сравнением
+кортежей (см. RowCompare). Поэтому стоимость запроса 10000-й страницы такая же,
+как и первой (при наличии индекса по полю).
+
+Номер страницы заменяется непрозрачным токеном (cursor), в котором закодированы
+значение ключа граничной записи и направление перехода.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import BooleanField, Expression, F, Value
+
+
+class RowCompare(Expression):
+    """
+    Сравнение кортежей "(a, b) < (x, y)". В отличие от равносильного
+    "a < x OR (a = x AND b < y)" такое условие SQLite и PostgreSQL выполняют
+    поиском диапазона по индексу (a, ...), а не перебором всех строк до границы.
+    """
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, lhs, operator, rhs):
+        super().__init__()
+        self.lhs, self.operator, self.rhs = list(lhs), operator, list(rhs)
+
+    def get_source_expressions(self):
+        return [*self.lhs, *self.rhs]
+
+    def set_source_expressions(self, exprs):
+        self.lhs, self.rhs = exprs[:len(self.lhs)], exprs[len(self.lhs):]
+
+    def as_sql(self, compiler, connection):
+        parts, params = [], []
+        for side in (self.lhs, self.rhs):
+            compiled = [compiler.compile(expression) for expression in side]
+            parts.append(", ".join(sql for sql, _ in compiled))
+            params.extend(param for _, side_params in compiled for param in side_params)
+        return f"({parts[0]}) {self.operator} ({parts[1]})", params
+
+
+class InvalidCursor(InvalidPage):
+    """Токен страницы повреждён или был сформирован не этим пагинатором"""
+    pass
+
+
+class KeysetPage:
+    """
+    Страница keyset-пагинатора. Повторяет ту часть интерфейса django Page,
+    которая используется в шаблонах (has_next, has_previous, итерация), но вместо
+    номеров страниц отдаёт токены next_cursor/previous_cursor.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<KeysetPage: {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    queryset - исходный запрос (может содержать select_related/prefetch_related)
+    per_page - количество объектов на странице
+    ordering - поле сортировки, например '-pub_date'. Для однозначности к нему всегда
+        добавляется первичный ключ с тем же направлением. Поле может содержать NULL,
+        такие записи выводятся в конце списка (как и при '-pub_date' в SQLite).
+    """
+
+    def __init__(self, queryset, per_page, ordering='-pub_date'):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        self.nullable = queryset.model._meta.get_field(self.field).null
+
+    def page(self, cursor=None):
+        """Вернуть страницу по токену, без токена - первую страницу"""
+        if not cursor:
+            return self._first_page()
+
+        value, pk, backwards = self.decode_cursor(cursor)
+        rows = self._fetch(value, pk, backwards)
+        if backwards:
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]  # Возвращаем исходный порядок сортировки
+            has_next = True
+        else:
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = True
+
+        if not rows:
+            # Граничные записи могли быть удалены - начинаем с начала
+            return self._first_page()
+        return self._build_page(rows, has_next, has_previous)
+
+    def _first_page(self):
+        rows = self._fetch()
+        return self._build_page(rows[:self.per_page], len(rows) > self.per_page, False)
+
+    def _build_page(self, rows, has_next, has_previous):
+        next_cursor = self.encode_cursor(rows[-1]) if has_next and rows else None
+        previous_cursor = self.encode_cursor(rows[0], backwards=True) if has_previous and rows else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def _fetch(self, value=None, pk=None, backwards=False):
+        """
+        До per_page + 1 записей после (value, pk), а при backwards - до неё в обратном порядке.
+        Список состоит из двух частей: записи со значением поля и затем "хвост" с NULL.
+        Каждая часть выбирается своим запросом с условием по кортежу, который идёт поиском
+        по индексу; запрос следующей части нужен, только если текущая закончилась.
+        """
+        limit = self.per_page + 1
+        # Части списка по порядку обхода: (NULL ли значения, есть ли условие по ключу)
+        if pk is None:  # Первая страница
+            segments = [(False, False), (True, False)]
+        elif backwards:
+            segments = [(True, True), (False, False)] if value is None else [(False, True)]
+        else:
+            segments = [(True, True)] if value is None else [(False, True), (True, False)]
+        rows = []
+        for nulls, keyed in segments:
+            if nulls and not self.nullable:
+                continue
+            rows += self._segment(nulls, backwards, (value, pk) if keyed else None)[:limit - len(rows)]
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def _segment(self, nulls, backwards, key=None):
+        """
+        Записи с NULL (nulls=True) или со значением поля в порядке списка (при backwards - в обратном),
+        при заданном key = (value, pk) - только строго после него в этом порядке
+        """
+        descending = self.descending != backwards
+        queryset = self.queryset
+        if nulls or key is None:
+            # При сравнении кортежей строки с NULL отсекаются и без этого условия
+            queryset = queryset.filter(**{f"{self.field}__isnull": nulls})
+        pk_order = '-pk' if descending else 'pk'
+        if nulls:
+            if key is not None:
+                queryset = queryset.filter(**{f"pk__{'lt' if descending else 'gt'}": key[1]})
+            return queryset.order_by(pk_order)
+        if key is not None:
+            field = self.queryset.model._meta.get_field(self.field)
+            queryset = queryset.filter(RowCompare([F(self.field), F('pk')], '<' if descending else '>',
+                                                  [Value(key[0], output_field=field),
+                                                   Value(key[1], output_field=self.queryset.model._meta.pk)]))
+        return queryset.order_by(F(self.field).desc() if descending else F(self.field).asc(), pk_order)
+
+    def encode_cursor(self, obj, backwards=False):
+        value = getattr(obj, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()  # Без потери микросекунд, иначе сравнение на равенство не сработает
+        data = {"v": value, "i": obj.pk}
+        if backwards:
+            data["b"] = 1
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(raw)
+            # Значение ключа приводится к типу поля: токен приходит от клиента, и строка
+            # вместо даты иначе дошла бы до фильтра и вызвала ValidationError (ошибку 500)
+            value = data["v"]
+            if value is not None:
+                value = self.queryset.model._meta.get_field(self.field).to_python(value)
+            return value, int(data["i"]), bool(data.get("b"))
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise InvalidCursor("Некорректный токен страницы")
@@ -0,0 +1,149 @@
+"""
+Общий слой JSON ответов для API без DRF (EntryJson, AuthorREST).
+
+- По умолчанию JSON компактный (без отступов и пробелов), с отступами - только при ?pretty=1.
+- Кодировщик выбирается настройкой JSON_ENCODER_BACKEND: 'orjson' (если пакет установлен)
+  или 'json' (стандартная библиотека). Без orjson используется стандартный.
+- Сжатие по заголовку Accept-Encoding: br (если установлен пакет brotli), иначе gzip.
+  Короткие ответы (меньше JSON_COMPRESS_MIN_LENGTH байт) не сжимаются.
+- ETag: декоратор etag_condition вычисляет его по лёгкой версии данных (см. conditional.py)
+  до выполнения view, при совпадении с If-None-Match - ответ 304 без запросов к данным и
+  сериализации. Сжатый ответ получает слабый ETag W/"...".
+"""
+import gzip
+import json
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def _dumps_json(data, pretty):
+    if pretty:
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4).encode()
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def _orjson_default(value):
+    # Наследники dict/list/str/int (ErrorDict и ErrorList ошибок формы, SafeString) orjson
+    # сериализует по внутреннему хранилищу: ErrorList, например, выводится как [] без сообщений.
+    # С OPT_PASSTHROUGH_SUBCLASS они приходят сюда и приводятся к базовому типу через свои методы
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if isinstance(value, str):
+        return str.__str__(value)  # str(value) у SafeString вернул бы тот же SafeString
+    if isinstance(value, int):
+        return int(value)
+    return _django_encoder.default(value)
+
+
+def _dumps_orjson(data, pretty):
+    if pretty:  # orjson умеет только отступ в 2 пробела, а ?pretty=1 нужен для чтения человеком
+        return _dumps_json(data, pretty)
+    # Даты и типы, которых orjson не знает (Decimal, lazy-строки перевода), отдаём кодировщику Django,
+    # чтобы вывод не зависел от выбранного кодировщика
+    return orjson.dumps(data, default=_orjson_default,
+                        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+
+JSON_ENCODER_BACKENDS = {
+    'json': _dumps_json,
+    'orjson': _dumps_orjson,
+}
+
+
+def get_encoder():
+    backend = getattr(settings, 'JSON_ENCODER_BACKEND', 'orjson')
+    if backend == 'orjson' and orjson is None:
+        backend = 'json'
+    return JSON_ENCODER_BACKENDS[backend]
+
+
+def dumps(data, pretty=False):
+    """Сериализовать data в байты JSON (UTF-8) выбранным кодировщиком"""
+    return get_encoder()(data, pretty)
+
+
+def _accepted_encodings(request):
+    # q=0 означает явный отказ от кодировки
+    encodings = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = item.strip().partition(';')
+        if not re.fullmatch(r'\s*q\s*=\s*0(\.0*)?\s*', params):
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def _compress(request, response, body):
+    if len(body) < getattr(settings, 'JSON_COMPRESS_MIN_LENGTH', 512):
+        return body
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encodings = _accepted_encodings(request)
+    if brotli is not None and 'br' in encodings:
+        response.headers['Content-Encoding'] = 'br'
+        return brotli.compress(body, quality=5)
+    if 'gzip' in encodings:
+        response.headers['Content-Encoding'] = 'gzip'
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+def json_response(request, data, status=200):
+    """
+    JSON ответ. data - любой сериализуемый объект (не только словарь).
+    Пример: return json_response(request, {"message": "Нет такой записи"}, status=404)
+    """
+    body = dumps(data, pretty=request.GET.get('pretty') in ('1', 'true'))
+    response = HttpResponse(content_type='application/json', status=status)
+    response.content = _compress(request, response, body)
+    return response
+
+
+def _etag_matches(request, etag):
+    # Сравнение слабое (RFC 9110): сжатый ответ отдаётся со слабым ETag W/"..."
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in if_none_match or etag in (tag.removeprefix('W/') for tag in if_none_match)
+
+
+def etag_condition(etag_func):
+    """
+    Декоратор view JSON API: etag_func(request, *args, **kwargs) возвращает версию данных
+    (или None - без условного ответа). Для GET/HEAD при совпадении с If-None-Match view
+    не вызывается. Пример: @method_decorator(etag_condition(conditional.search_json_etag), name='get')
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = None
+            if request.method in ('GET', 'HEAD'):
+                version = etag_func(request, *args, **kwargs)
+                etag = quote_etag(version) if version is not None else None
+                if etag is not None and _etag_matches(request, etag):
+                    response = HttpResponseNotModified()
+                    response.headers['ETag'] = etag
+                    patch_vary_headers(response, ('Accept-Encoding',))
+                    return response
+            response = view(request, *args, **kwargs)
+            if etag is not None and response.status_code == 200:
+                response.headers['ETag'] = 'W/' + etag if response.has_header('Content-Encoding') else etag
+            return response
+        return wrapper
+    return decorator
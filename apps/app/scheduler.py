@@ -0,0 +1,37 @@
+"""
+Публикация отложенных статей (status = 'scheduled'), у которых наступило время pub_date.
+
+Статьи переводятся в 'published' пачками по batch_size одним UPDATE на пачку, каждая
+пачка в своей транзакции. Выборка идёт по индексу (status, pub_date). UPDATE не вызывает
+сигналы сохранения, поэтому кэш боковой панели сбрасывается явно, а mod_date обновляется
+в том же UPDATE (от него зависят ETag страниц, см. conditional.py). Поисковый индекс
+обновлять не нужно: статус проверяется при поиске (см. search.py).
+
+Запуск: python manage.py publish_scheduled (однократно, например из cron)
+        python manage.py publish_scheduled --interval 60 (постоянно работающий процесс)
+"""
+from datetime import datetime, timezone
+
+from django.db import transaction
+
+from . import sidebar
+from .models import Entry
+
+
+def publish_due_entries(batch_size=500, now=None):
+    """Опубликовать все отложенные статьи, время которых наступило. Вернуть количество"""
+    now = now or datetime.now(timezone.utc)
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(Entry.objects.due(now).order_by('pub_date', 'id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            # Повторная проверка статуса: статью могли снять с публикации между выборкой и обновлением
+            total += Entry.objects.filter(id__in=ids, status=Entry.SCHEDULED).update(status=Entry.PUBLISHED,
+                                                                                     mod_date=now)
+        if len(ids) < batch_size:
+            break
+    if total:
+        sidebar.invalidate()
+    return total
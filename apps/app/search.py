@@ -0,0 +1,161 @@
+"""
+Полнотекстовый поиск по статьям (Entry): заголовок, краткое описание и текст.
+
+Индекс - виртуальная таблица SQLite FTS5 app_entry_search (создаётся миграцией
+0004_entry_search), rowid строки индекса равен id статьи. Текст статьи хранится в HTML
+(TinyMCE), поэтому в индекс записывается текст без тегов и HTML-сущностей. По той же
+причине индекс обновляется не триггерами, а сигналами post_save/post_delete (signals.py);
+после массовых изменений в обход сигналов индекс пересобирается командой rebuild_search_index.
+
+Результаты сортируются по BM25 с весами полей SEARCH_WEIGHTS (совпадение в заголовке
+важнее, чем в тексте), к каждому результату строится фрагмент текста с подсветкой
+найденных слов тегом <mark>. Ищутся только опубликованные статьи.
+
+Если таблицы индекса нет (другая СУБД, SQLite без FTS5), поиск выполняется через icontains
+без ранжирования и подсветки.
+"""
+import html
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import Entry
+
+SEARCH_TABLE = 'app_entry_search'
+SEARCH_WEIGHTS = (10.0, 4.0, 1.0)  # headline, summary, body
+SNIPPET_TOKENS = 24  # Количество слов во фрагменте с подсветкой
+
+# Маркеры подсветки из области Unicode для частного использования: в тексте статей их нет,
+# поэтому после экранирования HTML их можно безопасно заменить на теги <mark>
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchResult:
+    """Найденная статья, её место по BM25 (меньше - лучше) и фрагмент текста с подсветкой"""
+
+    def __init__(self, entry, rank=None, snippet=''):
+        self.entry = entry
+        self.rank = rank
+        self.snippet = snippet
+
+    def __repr__(self):
+        return f"<SearchResult: {self.entry.pk} {self.rank}>"
+
+
+def _connection():
+    return connections[router.db_for_read(Entry)]
+
+
+_available = {}  # Псевдоним БД -> есть ли таблица индекса
+
+
+def search_available():
+    """Есть ли в БД таблица индекса (результат кэшируется, сбрасывается после migrate - см. signals.py)"""
+    connection = _connection()
+    if connection.alias not in _available:
+        _available[connection.alias] = (connection.vendor == 'sqlite'
+                                        and SEARCH_TABLE in connection.introspection.table_names(include_views=False))
+    return _available[connection.alias]
+
+
+def reset_available(alias=None):
+    """Забыть результат search_available для БД alias (для всех БД, если не указан)"""
+    if alias is None:
+        _available.clear()
+    else:
+        _available.pop(alias, None)
+
+
+def entry_text(value):
+    """Текст поля для индекса: без HTML тегов и сущностей (&nbsp; &laquo; ...)"""
+    return " ".join(html.unescape(strip_tags(value or '')).split())
+
+
+def index_entry(entry):
+    """Добавить или обновить статью в индексе"""
+    with _connection().cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [entry.pk])
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}(rowid, headline, summary, body) VALUES (%s, %s, %s, %s)",
+                       [entry.pk, entry_text(entry.headline), entry_text(entry.summary),
+                        entry_text(entry.body_text)])
+
+
+def remove_entry(entry_id):
+    with _connection().cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [entry_id])
+
+
+def rebuild_index(chunk_size=500):
+    """Пересобрать индекс по всем статьям, вернуть количество проиндексированных статей"""
+    count = 0
+    with _connection().cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        entries = Entry.objects.order_by('pk').values_list('pk', 'headline', 'summary', 'body_text')
+        for pk, headline, summary, body_text in entries.iterator(chunk_size):
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}(rowid, headline, summary, body) VALUES (%s, %s, %s, %s)",
+                           [pk, entry_text(headline), entry_text(summary), entry_text(body_text)])
+            count += 1
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def parse_query(query):
+    """
+    Запрос пользователя -> выражение FTS5 MATCH. Синтаксис FTS5 (кавычки, NEAR, OR, *, ...)
+    пользователю не доступен: каждое слово ищется как префикс ("слов"*), слова объединяются через AND.
+    Префикс позволяет находить разные формы слова: "статья" найдёт и "статьями".
+    """
+    words = _WORD_RE.findall(query.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search(query, limit=10, offset=0):
+    """
+    Найти опубликованные статьи. Возвращает (количество найденных, список SearchResult
+    для текущей страницы).
+    """
+    match = parse_query(query)
+    if not match:
+        return 0, []
+    if not search_available():
+        return _search_fallback(query, limit, offset)
+
+    with _connection().cursor() as cursor:
+        # Для MATCH, bm25() и snippet() таблица индекса указывается по имени (без псевдонима)
+        join = (f"FROM {SEARCH_TABLE} JOIN {Entry._meta.db_table} e ON e.id = {SEARCH_TABLE}.rowid "
+                f"WHERE {SEARCH_TABLE} MATCH %s AND e.status = %s")
+        cursor.execute(f"SELECT COUNT(*) {join}", [match, Entry.PUBLISHED])
+        total = cursor.fetchone()[0]
+        if not total:
+            return 0, []
+        # snippet() берёт фрагмент из того поля, где совпадение лучше (номер поля -1)
+        cursor.execute(f"SELECT {SEARCH_TABLE}.rowid, bm25({SEARCH_TABLE}, %s, %s, %s) AS rank, "
+                       f"snippet({SEARCH_TABLE}, -1, %s, %s, '…', %s) "
+                       f"{join} ORDER BY rank LIMIT %s OFFSET %s",
+                       [*SEARCH_WEIGHTS, _MARK_START, _MARK_END, SNIPPET_TOKENS,
+                        match, Entry.PUBLISHED, limit, offset])
+        rows = cursor.fetchall()
+
+    entries = Entry.objects.for_list().select_related('blog').in_bulk([row[0] for row in rows])
+    return total, [SearchResult(entries[pk], rank, _highlight(snippet))
+                   for pk, rank, snippet in rows if pk in entries]
+
+
+def _search_fallback(query, limit, offset):
+    condition = Q()
+    for word in _WORD_RE.findall(query):
+        condition &= Q(headline__icontains=word) | Q(summary__icontains=word) | Q(body_text__icontains=word)
+    queryset = (Entry.objects.for_list().filter(condition, status=Entry.PUBLISHED)
+                .select_related('blog').order_by('-pub_date'))
+    return queryset.count(), [SearchResult(entry, snippet=escape(entry.summary))
+                              for entry in queryset[offset:offset + limit]]
@@ -0,0 +1,61 @@
+"""
+Кэш данных боковой панели (sidebar), общих для главной страницы, страницы блога
+и страницы статьи: список блогов, теги блога, последние записи.
+
+Данные меняются редко, поэтому хранятся в кэше 'sidebar' (см. CACHES в settings.py)
+в виде списков словарей. Инвалидация - через "поколение" кэша (см. generations.py):
+при изменении Blog, Entry или Tag (см. signals.py) поколение меняется.
+"""
+from django.core.cache import caches
+
+from .generations import CacheGeneration
+from .models import Blog, Entry, Tag
+
+SIDEBAR_CACHE_ALIAS = 'sidebar'
+
+_generation = CacheGeneration('sidebar:generation', SIDEBAR_CACHE_ALIAS)
+get_generation = _generation.get  # Текущее поколение кэша
+invalidate = _generation.invalidate  # Сбросить все данные боковой панели (сменой поколения)
+
+
+def _cache():
+    return caches[SIDEBAR_CACHE_ALIAS]
+
+
+def _cached(name, builder):
+    cache = _cache()
+    key = f"sidebar:{get_generation()}:{name}"
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value)
+    return value
+
+
+def get_blogs():
+    """Все блоги: id, name, slug_name"""
+    return _cached("blogs", lambda: list(Blog.objects.values('id', 'name', 'slug_name')))
+
+
+def get_tags(limit=10):
+    """Первые limit тегов"""
+    return _cached(f"tags:{limit}", lambda: list(Tag.objects.values('id', 'name', 'slug_name')[:limit]))
+
+
+def get_blog_tags(blog_id):
+    """Теги, которые встречаются в опубликованных статьях блога"""
+    return _cached(f"blog_tags:{blog_id}",
+                   lambda: list(Tag.objects.filter(entry__blog_id=blog_id, entry__status=Entry.PUBLISHED).distinct()
+                                .values('id', 'name', 'slug_name')))
+
+
+def get_recent_entries(blog_id=None, limit=None):
+    """Последние опубликованные записи (всего сайта или конкретного блога), без лимита - все записи блога"""
+    def builder():
+        entries = Entry.published.all()
+        if blog_id is not None:
+            entries = entries.filter(blog_id=blog_id)
+        entries = entries.values('id', 'headline', 'slug_headline', 'pub_date')
+        return list(entries[:limit] if limit is not None else entries)
+
+    return _cached(f"recent:{blog_id}:{limit}", builder)
@@ -0,0 +1,59 @@
+"""
+Обработчики сигналов моделей приложения. Подключаются в apps.py (метод ready).
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed, post_migrate
+from django.dispatch import receiver
+
+from . import conditional, sidebar, search
+from .counters import change_comment_count
+from .models import AuthorProfile, Blog, Entry, Tag, Comment
+
+
+@receiver([post_save, post_delete], sender=Blog)
+@receiver([post_save, post_delete], sender=Entry)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(m2m_changed, sender=Entry.tags.through)
+def invalidate_sidebar(sender, **kwargs):
+    # Сбрасываем после фиксации транзакции, иначе параллельный запрос
+    # может успеть закэшировать ещё старые данные
+    transaction.on_commit(sidebar.invalidate)
+
+
+@receiver([post_save, post_delete], sender=AuthorProfile)
+@receiver(post_save, sender=User)
+@receiver(m2m_changed, sender=Entry.authors.through)
+def invalidate_authors(sender, **kwargs):
+    # Имена авторов в JSON API статей (ETag, см. conditional.py)
+    transaction.on_commit(conditional.invalidate_authors)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:  # raw - загрузка фикстур (loaddata), счётчики уже в данных
+        change_comment_count(instance.entry_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    change_comment_count(instance.entry_id, -1)
+
+
+@receiver(post_save, sender=Entry)
+def index_entry(sender, instance, **kwargs):
+    # В той же транзакции, что и сохранение статьи: при откате откатится и индекс
+    if search.search_available():
+        search.index_entry(instance)
+
+
+@receiver(post_delete, sender=Entry)
+def remove_entry_from_index(sender, instance, **kwargs):
+    if search.search_available():
+        search.remove_entry(instance.pk)
+
+
+@receiver(post_migrate)
+def reset_search_available(sender, using, **kwargs):
+    # Миграции могли создать или удалить таблицу индекса
+    search.reset_available(using)
@@ -0,0 +1,53 @@
+"""
+Генерация slug из названий (Blog.slug_name, Entry.slug_headline).
+
+Транслитерация - самая дорогая часть, а одни и те же названия приходят повторно
+(пересохранение, импорт), поэтому результат slugify_text кэшируется в памяти процесса.
+Уникальность обеспечивается числовым суффиксом: "zagolovok", "zagolovok-2", "zagolovok-3"...
+Занятые варианты проверяются списком кандидатов (field IN (...) по CANDIDATES_PER_QUERY штук):
+это поиск по уникальному индексу поля, а не просмотр таблицы, как у LIKE 'начало%' или REGEXP.
+Обычно хватает одного запроса, следующий - только если заняты все кандидаты пачки.
+"""
+import re
+from functools import lru_cache
+
+from transliterate import translit
+
+SLUG_CACHE_SIZE = 4096
+CANDIDATES_PER_QUERY = 100  # Вариантов slug в одном запросе (в SQLite до 999 параметров на запрос)
+
+
+def make_slug(string):
+    # Удаление всех символов, не являющихся допустимыми для slug
+    slug = re.sub(r'[^a-zA-Z0-9_-]', '', string)
+    return slug
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def slugify_text(text):
+    """Slug из текста: транслит, нижний регистр, слова через '-'"""
+    return make_slug("-".join(translit(text, 'ru', reversed=True).lower().split()))
+
+
+def variant(base, number, max_length):
+    """Вариант slug с номером number: 1 - сам base, иначе base-N (длинный base укорачивается перед суффиксом)"""
+    if number == 1:
+        return base
+    suffix = f"-{number}"
+    return base[:max_length - len(suffix)] + suffix
+
+
+def unique_slug(queryset, field, text, max_length, fallback='item'):
+    """
+    Свободный slug для text среди объектов queryset (текущий объект из него нужно исключить):
+    сам slug, если не занят, иначе slug с наименьшим свободным суффиксом -2, -3, ...
+    """
+    base = (slugify_text(text) or fallback)[:max_length]
+    number = 1
+    while True:
+        candidates = [variant(base, n, max_length) for n in range(number, number + CANDIDATES_PER_QUERY)]
+        taken = set(queryset.filter(**{f'{field}__in': candidates}).values_list(field, flat=True))
+        for slug in candidates:
+            if slug not in taken:
+                return slug
+        number += CANDIDATES_PER_QUERY
@@ -0,0 +1,35 @@
+from django import template
+from django.urls import reverse
+
+from apps.app import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_url(profile, size=100):
+    """
+    URL уменьшенной копии аватара профиля пользователя.
+    Пример: <img src="{% avatar_url comment.user.user_profile 100 %}">
+    """
+    return images.avatar_url(profile, size)
+
+
+@register.simple_tag
+def entry_image_url(image, width):
+    """
+    URL уменьшенной копии картинки статьи заданной ширины (из images.ENTRY_IMAGE_WIDTHS).
+    Пример: <img src="{% entry_image_url entry.image 640 %}">
+    """
+    if not image or not image.name:
+        return ''
+    return reverse('app:entry-thumbnail', args=(width, image.name))
+
+
+@register.simple_tag
+def entry_srcset(image):
+    """
+    Атрибут srcset с копиями картинки статьи всех ширин.
+    Пример: <img src="..." srcset="{% entry_srcset entry.image %}" sizes="(max-width: 991px) 100vw, 730px">
+    """
+    return images.entry_image_srcset(image)
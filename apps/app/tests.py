@@ -1,3 +1,992 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import base64
+import gzip
+import json
+import io
+import os
+import sqlite3
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import Permission, User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from django.utils.http import urlencode
+from django.utils.translation import gettext_lazy
+from PIL import Image
+
+from project import query_budget
+from project.sqlite_backend import base as sqlite_backend
+
+from . import comments, images, rendering, responses, scheduler, search, sidebar, signals, slugs, views
+from .forms import EntryForm
+from .models import AuthorProfile, Blog, Comment, Entry, EntryQuerySet, Tag, UserProfile
+from .pagination import InvalidCursor, KeysetPaginator
+
+
+def image_file(name, size=(400, 300), fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+HEAVY_COLUMNS = [f'"{Entry._meta.db_table}"."{field}"' for field in EntryQuerySet.LIST_DEFERRED_FIELDS]
+BODY_HTML_COLUMN = f'"{Entry._meta.db_table}"."body_html"'
+
+
+class EntryListProjectionTests(TestCase):
+    """Списки статей не загружают полный текст body_text и body_html (см. EntryQuerySet.for_list)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('author', password='password')
+        cls.user.user_permissions.add(Permission.objects.get(codename='can_add_entry'))
+        author = AuthorProfile.objects.create(user=cls.user)
+        cls.blog = Blog.objects.create(name="Путешествия", slug_name='travel')
+        tag = Tag.objects.create(name="Горы", slug_name='gory')
+        cls.entries = []
+        for number in range(3):
+            entry = Entry.objects.create(blog=cls.blog, headline=f"Поход в горы {number}", summary="Кратко о походе",
+                                         body_text="<p>Полный текст статьи</p>" * 1000, status=Entry.PUBLISHED)
+            entry.authors.add(author)
+            entry.tags.add(tag)
+            cls.entries.append(entry)
+
+    def get_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def assertHeavyFieldsNotLoaded(self, url):
+        for sql in self.get_queries(url):
+            if sql.lstrip().upper().startswith('SELECT'):
+                for column in HEAVY_COLUMNS:
+                    self.assertNotIn(column, sql.split(' FROM ')[0], f"{url} загружает {column}: {sql}")
+
+    def test_index(self):
+        self.assertHeavyFieldsNotLoaded(reverse('app:index'))
+
+    def test_blog(self):
+        self.assertHeavyFieldsNotLoaded(reverse('app:blog', args=[self.blog.slug_name]))
+
+    def test_search(self):
+        self.assertHeavyFieldsNotLoaded(reverse('app:search') + '?q=поход')
+
+    def test_personal_account(self):
+        self.client.force_login(self.user)
+        self.assertHeavyFieldsNotLoaded(reverse('app:personal-account'))
+
+    def test_post_detail_loads_body_html(self):
+        # Проверка самой проверки: страница статьи полный текст загружает
+        queries = self.get_queries(reverse('app:post-detail', args=[self.entries[0].slug_headline]))
+        self.assertTrue(any(BODY_HTML_COLUMN in sql for sql in queries))
+
+
+class KeysetPaginatorTests(TestCase):
+    """Постраничный вывод по ключу (pub_date, id), в том числе статьи без даты (см. pagination.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        same_date = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        dates = [datetime(2024, 6, 1, tzinfo=timezone.utc), same_date, same_date, same_date,
+                 datetime(2024, 4, 1, 8, 30, 15, 123456, tzinfo=timezone.utc), None, None]
+        for number, pub_date in enumerate(dates):
+            # У черновика дата публикации при сохранении не проставляется
+            Entry.objects.create(blog=blog, headline=f"Статья {number}", summary="Кратко", pub_date=pub_date,
+                                 status=Entry.DRAFT if pub_date is None else Entry.PUBLISHED)
+        cls.expected = list(Entry.objects.order_by(F('pub_date').desc(nulls_last=True), '-pk')
+                            .values_list('pk', flat=True))
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Entry.objects.all(), 2)
+
+    def test_forward_and_back(self):
+        for per_page in (1, 2, 3, 5, 7, 8):  # Границы страниц в разных местах, в том числе на переходе к NULL
+            with self.subTest(per_page=per_page):
+                paginator = KeysetPaginator(Entry.objects.all(), per_page)
+                pages = [paginator.page()]
+                while pages[-1].has_next():
+                    pages.append(paginator.page(pages[-1].next_cursor))
+                self.assertEqual([entry.pk for page in pages for entry in page], self.expected)
+                self.assertFalse(pages[0].has_previous())
+
+                page = pages[-1]
+                back = [[entry.pk for entry in page]]
+                while page.has_previous():
+                    page = paginator.page(page.previous_cursor)
+                    back.append([entry.pk for entry in page])
+                self.assertEqual([pk for pks in reversed(back) for pk in pks], self.expected)
+
+    @skipUnless(connection.vendor == 'sqlite', "План запроса в формате SQLite")
+    def test_index_range_seek(self):
+        # Страница ленты выбирается поиском диапазона по индексу (status, pub_date), а не перебором строк
+        paginator = KeysetPaginator(Entry.published.all(), 1)
+        cursor = paginator.page().next_cursor
+        for cursor in (cursor, paginator.page(cursor).previous_cursor):
+            with self.subTest(cursor=cursor), CaptureQueriesContext(connection) as queries:
+                paginator.page(cursor)
+            with connection.cursor() as db_cursor:
+                db_cursor.execute("EXPLAIN QUERY PLAN " + queries.captured_queries[0]['sql'])
+                plan = " ".join(row[-1] for row in db_cursor.fetchall())
+            self.assertRegex(plan, r"SEARCH app_entry USING INDEX app_entry_status_pub_date_idx "
+                                   r"\(status=\? AND pub_date[<>]\?\)")
+
+    def test_invalid_cursor(self):
+        def token(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=').decode()
+
+        for cursor in ['abc', '!!!', token({"v": "abc", "i": 1}), token({"v": [1], "i": 1}),
+                       token({"v": None, "i": "x"}), token({"i": 1}), token([1, 2])]:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator.page(cursor)
+
+    def test_index_invalid_cursor(self):
+        cursor = base64.urlsafe_b64encode(b'{"v":"abc","i":1}').decode()
+        response = self.client.get(reverse('app:index'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchAvailableTests(TestCase):
+    """Наличие таблицы индекса проверяется один раз на БД и заново после migrate (см. search.py)"""
+
+    def test_cached_until_migrate(self):
+        search.reset_available()
+        self.assertTrue(search.search_available())
+        with self.assertNumQueries(0):
+            self.assertTrue(search.search_available())
+        search._available['default'] = False
+        signals.reset_search_available(sender=None, using='default')  # Обработчик post_migrate
+        self.assertTrue(search.search_available())
+
+
+class SearchTests(TestCase):
+    """Ранжирование и подсветка полнотекстового поиска (см. search.py) и EntrySearchJson"""
+
+    def setUp(self):
+        search.reset_available()
+        self.addCleanup(search.reset_available)
+        if not search.search_available():
+            self.skipTest("SQLite без FTS5")
+        self.blog = Blog.objects.create(name="Блог", slug_name='blog')
+
+    def create(self, headline, body_text, status=Entry.PUBLISHED):
+        return Entry.objects.create(blog=self.blog, headline=headline, summary="Кратко", body_text=body_text,
+                                    status=status)
+
+    def test_headline_outweighs_body(self):
+        in_body = self.create("Поездка", "<p>Вулкан на горизонте</p>")
+        in_headline = self.create("Вулкан", "<p>Поездка на остров</p>")
+        self.create("Вулкан черновик", "<p>Вулкан</p>", status=Entry.DRAFT)
+        total, results = search.search("вулкан")
+        self.assertEqual(total, 2)
+        self.assertEqual([result.entry for result in results], [in_headline, in_body])
+        self.assertLess(results[0].rank, results[1].rank)  # BM25 в SQLite: меньше - лучше
+
+    def test_prefix_and_all_words(self):
+        entry = self.create("Статьями о горах", "<p>Поход</p>")
+        self.create("Статья о море", "<p>Пляж</p>")
+        self.assertEqual([result.entry for result in search.search("статья гор")[1]], [entry])
+        # Операторы FTS5 ищутся как обычные слова (все обязательны), а не дают ошибку синтаксиса
+        self.assertEqual(search.search('"статья" OR NEAR(*)')[0], 0)
+
+    def test_snippet_escaping(self):
+        self.create("Разметка", "<p>Тег &lt;script&gt;alert(1)&lt;/script&gt; рядом со словом вулкан</p>")
+        _, [result] = search.search("вулкан")
+        self.assertIn("<mark>вулкан</mark>", result.snippet)
+        self.assertIn("&lt;script&gt;", result.snippet)
+        self.assertNotIn("<script>", result.snippet)
+
+    def test_search_json(self):
+        for number in range(3):
+            self.create(f"Вулкан {number}", "<p>Текст</p>")
+        url = reverse('app:entry-search')
+        response = self.client.get(url, {'q': "вулкан", 'limit': 2, 'offset': 2})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual((data['total'], len(data['results'])), (3, 1))
+        self.assertIn("<mark>", data['results'][0]['snippet'])
+        with self.assertNumQueries(0):  # Версия поиска - поколение боковой панели в кэше
+            self.assertEqual(self.client.get(url, {'q': "вулкан", 'limit': 2, 'offset': 2},
+                                             HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create("Вулкан 3", "<p>Текст</p>")
+        self.assertEqual(self.client.get(url, {'q': "вулкан", 'limit': 2, 'offset': 2},
+                                         HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        for params in [{'limit': 'abc'}, {'offset': 'x'}, {'limit': '1.5'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, dict(params, q="вулкан")).status_code, 400)
+
+
+class CommentCountTests(TestCase):
+    """Денормализованный счётчик Entry.number_of_comments (см. counters.py)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='password')
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        self.entries = [Entry.objects.create(blog=blog, headline=f"Статья {number}", summary="Кратко")
+                        for number in range(3)]
+        for entry, count in zip(self.entries, (4, 4, 2)):
+            for _ in range(count):
+                Comment.objects.create(user=self.user, entry=entry, text="Комментарий")
+
+    def assertCounts(self, expected):
+        counts = [entry.number_of_comments for entry in Entry.objects.filter(pk__in=[e.pk for e in self.entries])
+                  .order_by('pk')]
+        self.assertEqual(counts, expected)
+
+    def test_create_and_delete(self):
+        self.assertCounts([4, 4, 2])
+        Comment.objects.filter(entry=self.entries[2]).first().delete()
+        self.assertCounts([4, 4, 1])
+
+    def test_admin_bulk_delete(self):
+        comment_admin = site._registry[Comment]
+        with CaptureQueriesContext(connection) as queries:
+            comment_admin.delete_queryset(None, Comment.objects.all())
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith(f'UPDATE "{Entry._meta.db_table}"')]
+        self.assertEqual(len(updates), 2)  # По одному на приращение: -4 и -2
+        self.assertCounts([0, 0, 0])
+
+
+class CommentTreeTests(TestCase):
+    """Дерево комментариев статьи одним запросом (см. comments.py)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='password')
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        self.entry = Entry.objects.create(blog=blog, headline="Статья", summary="Кратко", status=Entry.PUBLISHED)
+        self.url = reverse('app:post-detail', args=[self.entry.slug_headline])
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(user=self.user, entry=self.entry, text=text, parent=parent)
+
+    def chain(self, depth):
+        parent = None
+        for level in range(depth):
+            parent = self.comment(f"Уровень {level}", parent)
+
+    def get(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        comment_queries = [query for query in queries.captured_queries
+                           if f'FROM "{Comment._meta.db_table}"' in query['sql']]
+        return response, len(queries), len(comment_queries)
+
+    def test_one_query_regardless_of_depth(self):
+        self.client.get(self.url)  # Прогрев кэша боковой панели
+        self.chain(2)
+        _, shallow_total, shallow_comments = self.get()
+        self.chain(10)
+        response, deep_total, deep_comments = self.get()
+        self.assertEqual((shallow_comments, deep_comments), (1, 1))
+        self.assertEqual(deep_total, shallow_total)
+        thread = response.context['comment_threads'][1]
+        self.assertEqual([comment.depth for comment in thread], list(range(10)))
+
+    def test_depth_and_order(self):
+        first = self.comment("Первый")
+        second = self.comment("Второй")
+        answer = self.comment("Ответ на первый", first)
+        self.comment("Ответ на ответ", answer)
+        self.comment("Второй ответ на первый", first)
+        roots = comments.build_comment_tree(self.entry)
+        self.assertEqual(roots, [first, second])
+        self.assertEqual([(comment.text, comment.depth) for comment in comments.flatten_thread(roots[0])],
+                         [("Первый", 0), ("Ответ на первый", 1), ("Ответ на ответ", 2),
+                          ("Второй ответ на первый", 1)])
+
+    def test_pagination(self):
+        roots = [self.comment(f"Корень {number}") for number in range(12)]
+        self.comment("Ответ", roots[11])
+        response, _, comment_queries = self.get({'comments_page': 2})
+        self.assertEqual(comment_queries, 1)
+        self.assertEqual(response.context['comment_page'].number, 2)
+        self.assertEqual([[comment.text for comment in thread] for thread in response.context['comment_threads']],
+                         [["Корень 10"], ["Корень 11", "Ответ"]])
+        response, _, _ = self.get({'comments_page': 'abc'})  # Некорректный номер - первая страница
+        self.assertEqual(len(response.context['comment_threads']), 10)
+
+
+class RenderingTests(TestCase):
+    """Обработка текста статьи при сохранении (см. rendering.py)"""
+
+    def test_sanitize(self):
+        html, text = rendering.render_body('<p onclick="x()">Привет<script>alert(1)</script></p>'
+                                           '<a href="java\tscript:alert(1)">ссылка</a><iframe src="x"></iframe>')
+        self.assertEqual(html, '<p>Привет</p><a>ссылка</a>')
+        self.assertEqual(text, 'Привет ссылка')
+
+    def test_transform(self):
+        html, _ = rendering.render_body('<h2>Введение</h2><h2>Введение</h2><img src="/media/a.jpg">'
+                                        '<a href="https://example.com">сайт</a><p>без закрытия')
+        self.assertEqual(html, '<h2 id="vvedenie">Введение</h2><h2 id="vvedenie-2">Введение</h2>'
+                               '<img src="/media/a.jpg" loading="lazy" decoding="async">'
+                               '<a href="https://example.com" rel="nofollow noopener">сайт</a><p>без закрытия</p>')
+
+    def test_entry_save(self):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        entry = Entry.objects.create(blog=blog, headline="Статья", summary="Кратко",
+                                     body_text="<p>" + "слово " * 400 + "</p>")
+        entry.refresh_from_db()
+        self.assertEqual(entry.reading_time, 2)
+        self.assertTrue(entry.excerpt.endswith('…'))
+        self.assertLessEqual(len(entry.excerpt), rendering.EXCERPT_LENGTH + 1)
+        self.assertEqual(entry.render_version, rendering.RENDER_VERSION)
+
+        entry.body_text = "<p>Новый текст</p>"
+        entry.save(update_fields=['body_text'])
+        entry.refresh_from_db()
+        self.assertEqual((entry.body_html, entry.excerpt), ("<p>Новый текст</p>", "Новый текст"))
+
+    def rerender(self, *args):
+        out = io.StringIO()
+        call_command('rerender_entries', *args, batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def test_rerender_entries(self):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        for number in range(5):
+            Entry.objects.create(blog=blog, headline=f"Статья {number}", summary="Кратко",
+                                 body_text=f"<p>Текст {number}<script>x()</script></p>")
+        # Результат прежних правил обработки
+        old_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        Entry.objects.update(body_html="старый", excerpt="старый", mod_date=old_date)
+
+        with mock.patch.object(rendering, 'RENDER_VERSION', rendering.RENDER_VERSION + 1):
+            self.assertIn("Обработано статей: 5", self.rerender())
+            for entry in Entry.objects.order_by('id'):
+                self.assertEqual(entry.body_html, f"<p>Текст {entry.headline[-1]}</p>")
+                self.assertEqual(entry.excerpt, f"Текст {entry.headline[-1]}")
+                self.assertEqual(entry.render_version, rendering.RENDER_VERSION)
+                self.assertGreater(entry.mod_date, old_date)  # Меняются ETag и Last-Modified страницы
+            self.assertIn("Обработано статей: 0", self.rerender())  # Устаревших больше нет
+            self.assertIn("Обработано статей: 5", self.rerender('--all'))
+
+        with self.assertRaises(CommandError):
+            call_command('rerender_entries', batch_size=0, stdout=io.StringIO())
+
+
+class SlugTests(TestCase):
+    """Уникальные slug статей и блогов с числовым суффиксом (см. slugs.py)"""
+
+    def test_entry_slug_suffix(self):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        entries = [Entry.objects.create(blog=blog, headline="Прогулка по Парижу", summary="Кратко") for _ in range(3)]
+        self.assertEqual([entry.slug_headline for entry in entries],
+                         ['progulka-po-parizhu', 'progulka-po-parizhu-2', 'progulka-po-parizhu-3'])
+
+    def test_index_search(self):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        for headline in ["Прогулка по Парижу ночью", "Прогулка по Парижу"]:
+            Entry.objects.create(blog=blog, headline=headline, summary="Кратко")
+        queryset = Entry.objects.exclude(pk=0)  # Как в Entry._free_slug
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(slugs.unique_slug(queryset, 'slug_headline', "Прогулка по Парижу", 200),
+                             'progulka-po-parizhu-2')
+        self.assertEqual(len(queries.captured_queries), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries.captured_queries[0]['sql']}")
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        # Поиск по уникальному индексу slug, а не просмотр таблицы
+        self.assertRegex(plan, r'SEARCH app_entry USING (COVERING )?INDEX \S+ \(slug_headline=\?\)')
+        self.assertNotIn('SCAN', plan)
+
+    def test_next_candidates(self):
+        Blog.objects.create(name="Блог", slug_name='blog')
+        Blog.objects.bulk_create([Blog(name=f"Блог {number}", slug_name=f'blog-{number}') for number in range(2, 6)])
+        with mock.patch.object(slugs, 'CANDIDATES_PER_QUERY', 2), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(slugs.unique_slug(Blog.objects.all(), 'slug_name', "Blog", 100), 'blog-6')
+        self.assertEqual(len(queries.captured_queries), 3)  # Пачки blog..blog-2, blog-3..blog-4, blog-5..blog-6
+
+    def test_long_slug_suffix(self):
+        self.assertEqual(slugs.unique_slug(Blog.objects.none(), 'slug_name', "a" * 30, 12), "a" * 12)
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        entries = [Entry.objects.create(blog=blog, headline="Слово " * 60, summary="Кратко") for _ in range(3)]
+        max_length = Entry._meta.get_field('slug_headline').max_length
+        self.assertTrue(all(len(entry.slug_headline) <= max_length for entry in entries))
+        self.assertEqual([entry.slug_headline[-2:] for entry in entries[1:]], ['-2', '-3'])
+
+    def test_blog_slug_autofill(self):
+        first = Blog.objects.create(name="Путешествия")
+        second = Blog.objects.create(name="путешествия!")
+        self.assertEqual((first.slug_name, second.slug_name), ('puteshestvija', 'puteshestvija-2'))
+
+
+@skipUnless(responses.orjson, "orjson не установлен")
+class JsonEncoderBackendTests(TestCase):
+    """Кодировщики 'json' и 'orjson' дают одинаковые байты, сжатие и ?pretty=1 (см. responses.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        entry = Entry.objects.create(blog=blog, headline="Статья", summary="Кратко " * 200)  # Длиннее порога сжатия
+        cls.url = reverse('app:entry', args=[entry.id])
+
+    def test_same_output(self):
+        form = EntryForm(data={'headline': "Заголовок"})
+        self.assertFalse(form.is_valid())
+        data = {"errors": form.errors, "safe": mark_safe("<b>текст</b>"), "lazy": gettext_lazy("Entry"),
+                "decimal": Decimal('4.50'), "date": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+                "nested": [(1, 2), {"ids": [1, None, True]}]}
+        json_body = responses.JSON_ENCODER_BACKENDS['json'](data, False)
+        self.assertIn("This field is required.", json_body.decode())
+        self.assertEqual(responses.JSON_ENCODER_BACKENDS['orjson'](data, False), json_body)
+
+    def get(self, params=None, **headers):
+        return self.client.get(self.url, params, **headers)
+
+    def test_gzip(self):
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))  # Сжатый ответ - слабый ETag
+        self.assertEqual(json.loads(gzip.decompress(response.content))['headline'], "Статья")
+
+    def test_no_compression(self):
+        for encoding in ['', 'gzip;q=0', 'identity']:
+            with self.subTest(encoding=encoding):
+                response = self.get(HTTP_ACCEPT_ENCODING=encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertFalse(response['ETag'].startswith('W/'))
+                self.assertEqual(json.loads(response.content)['headline'], "Статья")
+
+    def test_brotli(self):
+        fake = mock.Mock(compress=lambda body, quality: b'br:' + body)
+        with mock.patch.object(responses, 'brotli', fake):
+            response = self.get(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertTrue(response.content.startswith(b'br:{'))
+        with mock.patch.object(responses, 'brotli', None):  # Без пакета brotli - gzip
+            self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='br, gzip')['Content-Encoding'], 'gzip')
+
+    def test_pretty(self):
+        compact = self.get().content.decode()
+        self.assertNotIn('\n', compact)
+        self.assertIn('"headline":"Статья"', compact)  # Без пробелов и без экранирования кириллицы
+        pretty = self.get({'pretty': 1}).content.decode()
+        self.assertIn('\n    "headline": "Статья"', pretty)
+        self.assertEqual(json.loads(pretty), json.loads(compact))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_WORKERS=0)
+class AvatarVariantTests(TestCase):
+    """Копии аватара создаются после сохранения, а avatar_url не опрашивает хранилище (см. images.py)"""
+
+    def test_avatar_url(self):
+        user = User.objects.create_user('reader', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = UserProfile.objects.create(user=user, avatar=image_file('avatar.png'))
+        self.assertEqual(images.avatar_url(profile, 80), profile.avatar.url)  # Копии ещё не отмечены в объекте
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.avatar_variants_hash, profile.avatar_hash)
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError("запрос к хранилищу")):
+            url = images.avatar_url(profile, 80)
+        self.assertEqual(url, default_storage.url(images.avatar_variant_name(profile.avatar_hash, 100, 'webp')))
+        self.assertTrue(default_storage.exists(images.avatar_variant_name(profile.avatar_hash, 100, 'webp')))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class EntryThumbnailTests(TestCase):
+    """Копии картинок статей в дисковом кэше (см. images.entry_thumbnail_path)"""
+
+    def setUp(self):
+        cache_dir = override_settings(THUMBNAIL_CACHE_DIR=tempfile.mkdtemp())  # Пустой кэш для каждого теста
+        cache_dir.enable()
+        self.addCleanup(cache_dir.disable)
+        images._cache_bytes = None
+        self.addCleanup(setattr, images, '_cache_bytes', None)
+
+    def get(self, name, width=320):
+        return self.client.get(reverse('app:entry-thumbnail', args=(width, name)))
+
+    def test_content_type_of_written_format(self):
+        for name, fmt, content_type in [('image_entry/photo.gif', 'GIF', 'image/jpeg'),
+                                        ('image_entry/photo.png', 'PNG', 'image/png'),
+                                        ('image_entry/photo.jpeg', 'JPEG', 'image/jpeg')]:
+            with self.subTest(name=name):
+                default_storage.save(name, image_file(name, fmt=fmt))
+                response = self.get(name)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).format,
+                                 content_type.split('/')[1].upper())
+
+    def test_cache_scanned_once(self):
+        default_storage.save('image_entry/a.png', image_file('a.png'))
+        self.assertEqual(self.get('image_entry/a.png', 320).status_code, 200)
+        with mock.patch('apps.app.images.os.walk', side_effect=AssertionError("сканирование кэша")):
+            self.assertEqual(self.get('image_entry/a.png', 640).status_code, 200)
+        with override_settings(THUMBNAIL_CACHE_MAX_BYTES=1):
+            self.assertEqual(self.get('image_entry/a.png', 960).status_code, 200)
+        # Превышение лимита - вытеснены все копии, кроме только что созданной
+        self.assertEqual([os.listdir(os.path.join(settings.THUMBNAIL_CACHE_DIR, width, 'image_entry'))
+                          for width in ('320', '640', '960')], [[], [], ['a.png']])
+
+    def test_evicted_before_open(self):
+        default_storage.save('image_entry/a.png', image_file('a.png'))
+        original = images.entry_thumbnail_path
+        paths = iter(['/nonexistent/evicted.png'])
+        with mock.patch('apps.app.images.entry_thumbnail_path',
+                        side_effect=lambda name, width: next(paths, None) or original(name, width)):
+            response = self.get('image_entry/a.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified страниц статьи и блога (см. conditional.py)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='password')
+        self.blog = Blog.objects.create(name="Блог", slug_name='blog')
+        self.entry = Entry.objects.create(blog=self.blog, headline="Статья", summary="Кратко",
+                                          body_text="<p>Текст</p>", status=Entry.PUBLISHED)
+        self.urls = {'post': reverse('app:post-detail', args=[self.entry.slug_headline]),
+                     'blog': reverse('app:blog', args=[self.blog.slug_name])}
+
+    def etags(self):
+        etags = {}
+        for name, url in self.urls.items():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etags[name] = response['ETag']
+        return etags
+
+    def test_not_modified_without_rendering(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                view = response.resolver_match.func.view_class
+                with mock.patch.object(view, 'get_context_data', side_effect=AssertionError("рендеринг")):
+                    self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+                    self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                                     .status_code, 304)
+
+    def test_changes_update_validator(self):
+        comment = Comment(user=self.user, entry=self.entry, text="Комментарий")
+
+        def edit_comment():
+            comment.text = "Исправленный комментарий"
+            comment.save()
+
+        def edit_entry():
+            self.entry.summary = "Новое кратко"
+            self.entry.save()
+
+        def edit_blog():
+            self.blog.tagline = "Новый слоган"
+            self.blog.save()
+
+        for change, pages in [(comment.save, ['post', 'blog']), (edit_comment, ['post']),
+                              (edit_entry, ['post', 'blog']), (edit_blog, ['post', 'blog'])]:
+            before = self.etags()
+            with self.captureOnCommitCallbacks(execute=True):  # Сброс поколения sidebar - после фиксации
+                change()
+            after = self.etags()
+            for page in pages:
+                with self.subTest(change=change.__name__, page=page):
+                    self.assertNotEqual(before[page], after[page])
+
+    def test_user_specific_validator(self):
+        anonymous = self.etags()
+        self.client.force_login(self.user)
+        logged_in = self.etags()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertNotEqual(anonymous[name], logged_in[name])
+                self.client.logout()
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=logged_in[name]).status_code, 200)
+                self.client.force_login(self.user)
+
+
+class ScheduledPublishingTests(TestCase):
+    """Публикация отложенных статей (см. scheduler.py и команду publish_scheduled)"""
+
+    def test_publish_due_entries(self):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        hour = timedelta(hours=1)
+        entries = {name: Entry.objects.create(blog=blog, headline=name, summary="Кратко", status=status,
+                                              pub_date=pub_date)
+                   for name, status, pub_date in [('due', Entry.SCHEDULED, now - hour),
+                                                  ('due_now', Entry.SCHEDULED, now),
+                                                  ('future', Entry.SCHEDULED, now + hour),
+                                                  ('draft', Entry.DRAFT, now - hour)]}
+
+        self.assertEqual(scheduler.publish_due_entries(batch_size=1, now=now), 2)
+        statuses = dict(Entry.objects.filter(pk__in=[entry.pk for entry in entries.values()])
+                        .values_list('headline', 'status'))
+        self.assertEqual(statuses, {'due': Entry.PUBLISHED, 'due_now': Entry.PUBLISHED,
+                                    'future': Entry.SCHEDULED, 'draft': Entry.DRAFT})
+        self.assertEqual(Entry.objects.get(pk=entries['due'].pk).mod_date, now)
+        self.assertEqual(scheduler.publish_due_entries(now=now), 0)
+
+    def test_command(self):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        Entry.objects.create(blog=blog, headline="Статья", summary="Кратко", status=Entry.SCHEDULED,
+                             pub_date=datetime.now(timezone.utc) - timedelta(minutes=1))
+        out = io.StringIO()
+        call_command('publish_scheduled', stdout=out)
+        self.assertIn("Опубликовано статей: 1", out.getvalue())
+        self.assertEqual(Entry.published.count(), 1)
+
+
+class QueryBudgetTests(TestCase):
+    """Бюджет запросов на view и поиск N+1 (см. project/query_budget.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.blog = Blog.objects.create(name="Блог", slug_name='blog')
+        cls.url = reverse('app:blog', args=[cls.blog.slug_name])
+
+    # Middleware читает настройки при создании, а тестовый клиент создаёт цепочку при первом запросе теста
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'app:blog': 1})
+    def test_raise_over_budget(self):
+        with self.assertRaisesRegex(query_budget.QueryBudgetExceeded, r"\(app:blog\): \d+ запросов при бюджете 1"):
+            self.client.get(self.url)
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'app:blog': 100})
+    def test_within_budget(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_MODE='warn', QUERY_BUDGETS={'app:blog': 1})
+    def test_warn_over_budget(self):
+        with self.assertLogs('project.query_budget', 'WARNING') as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("при бюджете 1", logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'app:blog': 1}, QUERY_BUDGET_EXEMPT_PATHS=('/blog/',))
+    def test_exempt_path(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'app:entry': 1})
+    def test_budget_only_for_reads(self):
+        entry = Entry.objects.create(blog=self.blog, headline="Статья", summary="Кратко")
+        url = reverse('app:entry', args=[entry.id])
+        with self.assertRaises(query_budget.QueryBudgetExceeded):
+            self.client.get(url)
+        self.assertEqual(self.client.patch(url, 'summary=x', content_type='application/x-www-form-urlencoded')
+                         .status_code, 200)
+
+    def test_raise_in_tests(self):
+        self.assertEqual(settings.QUERY_BUDGET_MODE, 'raise')  # См. project/test_runner.py
+
+    def test_after_debug_toolbar(self):
+        # Запросы debug_toolbar выполняются снаружи middleware бюджета и не учитываются
+        self.assertGreater(settings.MIDDLEWARE.index('project.query_budget.QueryBudgetMiddleware'),
+                           settings.MIDDLEWARE.index('debug_toolbar.middleware.DebugToolbarMiddleware'))
+
+    def test_repeated_queries(self):
+        stats = query_budget.QueryStats()
+        with connection.execute_wrapper(stats):
+            for size in (2, 3, 4):  # Списки IN разной длины - один и тот же вид запроса
+                list(Entry.objects.filter(pk__in=range(size)))
+        self.assertEqual(len(stats.repeated(3)), 1)
+        self.assertIn("IN (%s, ...)", stats.repeated(3)[0][0])
+
+
+class FeedQueryCountTests(TestCase):
+    """Лента главной страницы и блога - постоянное число запросов (см. EntryQuerySet.feed)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.blog = Blog.objects.create(name="Блог", slug_name='blog')
+        tags = [Tag.objects.create(name=f"Тег {number}", slug_name=f'tag-{number}') for number in range(3)]
+        authors = [AuthorProfile.objects.create(user=User.objects.create_user(f'author{number}'))
+                   for number in range(3)]
+        for number in range(8):
+            entry = Entry.objects.create(blog=cls.blog, headline=f"Статья {number}", summary="Кратко",
+                                         status=Entry.PUBLISHED, number_of_comments=number)
+            entry.authors.add(*authors)
+            entry.tags.add(*tags)
+
+    def assertQueries(self, url, expected):
+        self.client.get(url)  # Заполняет кэш боковой панели
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'author2')
+
+    def test_index(self):
+        # Баннер: статьи + авторы с пользователями; лента: статьи + авторы + теги
+        self.assertQueries(reverse('app:index'), 5)
+
+    def test_blog(self):
+        # Версия страницы (conditional.py), блог, лента: статьи + авторы + теги
+        self.assertQueries(reverse('app:blog', args=[self.blog.slug_name]), 5)
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class PostDetailQueryCountTests(TestCase):
+    """Страница статьи в бюджете запросов QUERY_BUDGETS['app:post-detail'] при любом числе авторов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        blog = Blog.objects.create(name="Блог", slug_name='blog')
+        cls.authors = [AuthorProfile.objects.create(user=User.objects.create_user(f'author{number}'))
+                       for number in range(5)]
+        cls.entry = Entry.objects.create(blog=blog, headline="Статья", summary="Кратко", status=Entry.PUBLISHED)
+        cls.entry.authors.add(*cls.authors)
+        cls.entry.tags.add(*[Tag.objects.create(name=f"Тег {number}", slug_name=f'tag-{number}') for number in range(3)])
+        parent = None
+        for author in cls.authors:
+            parent = Comment.objects.create(user=author.user, entry=cls.entry, text="Комментарий", parent=parent)
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        cls.url = reverse('app:post-detail', args=[cls.entry.slug_headline])
+
+    def get(self, user, expected):
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 200)  # Холодный кэш - тоже в бюджете
+        with self.assertNumQueries(expected):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'author4')
+        return response
+
+    def test_staff(self):
+        # Сессия, пользователь, версия страницы (conditional.py), статья с блогом, авторы, теги, комментарии
+        response = self.get(self.staff, 7)
+        self.assertTrue(response.context['can_reply'])
+
+    def test_author(self):
+        self.assertTrue(self.get(self.authors[3].user, 7).context['can_reply'])
+        self.assertFalse(self.get(User.objects.create_user('reader'), 7).context['can_reply'])
+
+
+class SidebarCacheTests(TestCase):
+    """Кэш боковой панели и его сброс сигналами (см. sidebar.py и signals.py)"""
+
+    def setUp(self):
+        caches[sidebar.SIDEBAR_CACHE_ALIAS].clear()
+        self.blog = Blog.objects.create(name="Блог", slug_name='blog')
+        self.tag = Tag.objects.create(name="Горы", slug_name='gory')
+        self.entry = Entry.objects.create(blog=self.blog, headline="Статья", summary="Кратко", status=Entry.PUBLISHED)
+
+    def read_all(self):
+        return (sidebar.get_blogs(), sidebar.get_tags(10), sidebar.get_blog_tags(self.blog.id),
+                sidebar.get_recent_entries(self.blog.id, limit=6), sidebar.get_recent_entries(limit=5))
+
+    def test_cache_hit(self):
+        first = self.read_all()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.read_all(), first)
+
+    def test_invalidation(self):
+        def create_entry():
+            Entry.objects.create(blog=self.blog, headline="Новая статья", summary="Кратко", status=Entry.PUBLISHED)
+
+        def rename_blog():
+            self.blog.name = "Новое имя"
+            self.blog.save()
+
+        changes = [create_entry, rename_blog, lambda: Tag.objects.create(name="Море", slug_name='more'),
+                   lambda: self.entry.tags.add(self.tag), lambda: self.entry.tags.remove(self.tag),
+                   lambda: self.tag.delete(), lambda: self.entry.delete()]
+        for number, change in enumerate(changes):
+            with self.subTest(change=number):
+                before = self.read_all()
+                with self.captureOnCommitCallbacks(execute=True):  # Поколение сбрасывается после фиксации
+                    change()
+                with CaptureQueriesContext(connection) as queries:
+                    after = self.read_all()
+                self.assertEqual(len(queries), 5)  # Все данные заново из БД
+                self.assertNotEqual(after, before)
+
+    def test_post_detail_recent_limit(self):
+        for number in range(7):
+            Entry.objects.create(blog=self.blog, headline=f"Статья {number}", summary="Кратко",
+                                 status=Entry.PUBLISHED)
+        response = self.client.get(reverse('app:post-detail', args=[self.entry.slug_headline]))
+        self.assertEqual(len(response.context['blog_entryes']), 5)
+        self.assertNotIn(self.entry.id, [item['id'] for item in response.context['blog_entryes']])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_WORKERS=0)
+class EntryJsonTests(TestCase):
+    """JSON API статей EntryJson: пакетное чтение ?ids= и изменение PUT/PATCH"""
+
+    def setUp(self):
+        self.blogs = [Blog.objects.create(name=f"Блог {number}", slug_name=f'blog-{number}') for number in range(2)]
+        self.tags = [Tag.objects.create(name=f"Тег {number}", slug_name=f'tag-{number}') for number in range(2)]
+        self.authors = [AuthorProfile.objects.create(user=User.objects.create_user(f'author{number}'))
+                        for number in range(2)]
+        self.entry = Entry.objects.create(blog=self.blogs[0], headline="Статья", summary="Кратко",
+                                          body_text="<p>Текст</p>", image=image_file('a.png'),
+                                          status=Entry.PUBLISHED)
+        self.entry.authors.set(self.authors)
+        self.entry.tags.set(self.tags[:1])
+        self.url = reverse('app:entry', args=[self.entry.id])
+
+    def multipart(self, method, data):
+        return getattr(self.client, method)(self.url, encode_multipart(BOUNDARY, data), content_type=MULTIPART_CONTENT)
+
+    def state(self):
+        entry = Entry.objects.get(id=self.entry.id)
+        return {'blog': entry.blog_id, 'headline': entry.headline, 'summary': entry.summary,
+                'body_text': entry.body_text, 'image': entry.image.name, 'status': entry.status,
+                'authors': sorted(entry.authors.values_list('id', flat=True)),
+                'tags': sorted(entry.tags.values_list('id', flat=True))}
+
+    def test_multipart_patch_keeps_other_fields(self):
+        before = self.state()
+        response = self.multipart('patch', {'headline': "Новый заголовок"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.state(), dict(before, headline="Новый заголовок"))
+
+    def test_put_with_file(self):
+        response = self.multipart('put', {'blog': self.blogs[1].id, 'headline': "Другая статья",
+                                          'summary': "Другое", 'body_text': "<p>Другой текст</p>",
+                                          'pub_date': "2024-05-01 10:00", 'authors': [self.authors[1].id],
+                                          'tags': [tag.id for tag in self.tags], 'status': Entry.PUBLISHED,
+                                          'image': image_file('b.png')})
+        self.assertEqual(response.status_code, 200, response.content)
+        state = self.state()
+        self.assertTrue(state.pop('image').startswith('image_entry/b'))
+        self.assertEqual(state, {'blog': self.blogs[1].id, 'headline': "Другая статья", 'summary': "Другое",
+                                 'body_text': "<p>Другой текст</p>", 'status': Entry.PUBLISHED,
+                                 'authors': [self.authors[1].id], 'tags': sorted(tag.id for tag in self.tags)})
+
+    def test_put_requires_all_fields(self):
+        before = self.state()
+        response = self.multipart('put', {'headline': "Только заголовок"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('summary', json.loads(response.content)['errors'])
+        self.assertEqual(self.state(), before)
+
+    def test_urlencoded_patch(self):
+        before = self.state()
+        response = self.client.patch(self.url, urlencode({'summary': "Новое описание", 'tags': [self.tags[1].id]},
+                                                         doseq=True),
+                                     content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.state(), dict(before, summary="Новое описание", tags=[self.tags[1].id]))
+
+    def test_broken_multipart(self):
+        before = self.state()
+        response = self.client.patch(self.url, b'headline=x', content_type='multipart/form-data')  # Без boundary
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.state(), before)
+
+    def test_batch_get(self):
+        others = [Entry.objects.create(blog=self.blogs[1], headline=f"Статья {number}", summary="Кратко")
+                  for number in range(3)]
+        for entry in others:
+            entry.authors.set(self.authors[1:])
+            entry.tags.set(self.tags)
+        ids = [others[2].id, self.entry.id, 999, others[0].id, self.entry.id]
+        with self.assertNumQueries(4):  # Версия для ETag, статьи с блогами, авторы, теги - независимо от числа id
+            response = self.client.get(reverse('app:entry-post'), {'ids': ",".join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual([item['entry_id'] for item in data['entries']], [others[2].id, self.entry.id, others[0].id])
+        self.assertEqual(data['not_found'], [999])
+        self.assertEqual(data['entries'][1]['blog_name'], "Блог 0")
+        self.assertEqual(len(data['entries'][1]['authors']), 2)
+
+    def test_etag(self):
+        self.client.get(self.url)  # Прогрев поколений в кэше
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):  # Только версия статьи: статья, авторы и теги не загружаются
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        def rename_author():
+            user = self.authors[0].user
+            user.username = 'renamed'
+            user.save()
+
+        changes = [rename_author,
+                   lambda: self.entry.authors.remove(self.authors[1]),
+                   lambda: Tag.objects.filter(pk=self.tags[0].pk).get().save(),
+                   lambda: Blog.objects.get(pk=self.blogs[0].pk).save(),
+                   lambda: Entry.objects.get(pk=self.entry.pk).save()]
+        for number, change in enumerate(changes):
+            with self.subTest(change=number):
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+                etag = response['ETag']
+
+    def test_batch_etag(self):
+        url = reverse('app:entry-post')
+        etag = self.client.get(url, {'ids': f"{self.entry.id},999"})['ETag']
+        self.assertEqual(self.client.get(url, {'ids': f"{self.entry.id},999"}, HTTP_IF_NONE_MATCH=etag).status_code,
+                         304)
+        self.assertEqual(self.client.get(url, {'ids': f"{self.entry.id}"}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertFalse(self.client.get(url, {'ids': "abc"}).has_header('ETag'))
+        self.assertFalse(self.client.get(reverse('app:entry', args=[999])).has_header('ETag'))
+
+    def test_batch_get_invalid_ids(self):
+        too_many = ",".join(str(number) for number in range(1, views.EntryJson.MAX_BATCH_IDS + 2))
+        for ids in ["", " , ", "1,abc", "1.5", too_many]:
+            with self.subTest(ids=ids[:20]):
+                response = self.client.get(reverse('app:entry-post'), {'ids': ids})
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('app:entry-post'))
+        self.assertEqual(response.status_code, 400)
+
+
+class SqliteBackendTests(TestCase):
+    """Профиль SQLITE_PROFILE=tuned: PRAGMA и BEGIN IMMEDIATE (см. project/sqlite_backend)"""
+
+    def connect(self, options):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, 'db.sqlite3')
+        wrapper = sqlite_backend.DatabaseWrapper({**connection.settings_dict, 'NAME': path, 'OPTIONS': options},
+                                                 alias='sqlite_backend_test')
+        self.addCleanup(wrapper.close)
+        return wrapper, path
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_tuned_pragmas(self):
+        wrapper, _ = self.connect(settings.SQLITE_PROFILES['tuned'])
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 20000)  # OPTIONS timeout, мс
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # normal
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)  # memory
+
+        plain, _ = self.connect(settings.SQLITE_PROFILES['plain'])
+        self.assertEqual(self.pragma(plain, 'journal_mode'), 'delete')
+
+    def test_begin_immediate(self):
+        wrapper, path = self.connect(settings.SQLITE_PROFILES['tuned'])
+        with wrapper.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+        with CaptureQueriesContext(wrapper) as queries:
+            wrapper._start_transaction_under_autocommit()  # Так начинает транзакцию transaction.atomic()
+        self.assertEqual(queries.captured_queries[0]['sql'], "BEGIN IMMEDIATE")
+        # Блокировка записи взята в начале транзакции, ещё до первой записи
+        other = sqlite3.connect(path, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaisesRegex(sqlite3.OperationalError, "locked"):
+            other.execute("INSERT INTO item VALUES (1)")
+        wrapper.connection.rollback()
+
+    def test_invalid_transaction_mode(self):
+        wrapper, _ = self.connect({'transaction_mode': 'LAZY'})
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.ensure_connection()
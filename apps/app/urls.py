@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import IndexView, BlogView, AboutView, PostDetailView, \
     PersonalAccountView, LoginView, AboutServiceView, LogoutView
-from .views import EntryJson
+from .views import EntryJson, EntryImageThumbnailView, SearchView, EntrySearchJson
 
 app_name = 'app'
 
@@ -14,7 +14,10 @@ urlpatterns = [
     path('personal/', PersonalAccountView.as_view(), name='personal-account'),
     path('login/<param>/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('search/', SearchView.as_view(), name='search'),
     path('entry/', EntryJson.as_view(), name='entry-post'),
+    path('entry/search/', EntrySearchJson.as_view(), name='entry-search'),
     path('entry/<int:id>/', EntryJson.as_view(), name='entry'),
+    path('thumb/<int:width>/<path:name>', EntryImageThumbnailView.as_view(), name='entry-thumbnail'),
 ]
 
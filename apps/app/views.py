@@ -1,7 +1,7 @@
 import time
 
 from django.shortcuts import render, get_object_or_404, resolve_url, redirect
-from django.http import JsonResponse, QueryDict
+from django.http import QueryDict, FileResponse, Http404
 from django.utils.datastructures import MultiValueDict
 from django.views.generic import View, TemplateView, DetailView, CreateView, FormView
 from .models import Blog, Entry, Tag, Comment, AuthorProfile
@@ -9,38 +9,41 @@ from .forms import CommentForm, CustomUserCreationForm, EntryForm
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .pagination import KeysetPaginator, InvalidCursor
+from . import sidebar, images, search, conditional
+from .responses import etag_condition, json_response
+from .comments import build_comment_tree, flatten_thread, paginate_threads
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.db.models import F
+from django.db.models import Prefetch
+from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
-import json
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.utils.decorators import method_decorator
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import io
+from django.http.multipartparser import MultiPartParserError
+import mimetypes
 
 
 class IndexView(View):
     def get(self, request):
-        blogs = Blog.objects.all()
-        all_entryes = Entry.objects.all().prefetch_related("authors").select_related("blog")  # Получить все записи с
-        # предварительно загруженными отношениям по авторам и блогу
-        most_entryes = all_entryes.order_by('-number_of_comments')[:5]  # Получить последние 5 статей по числу комментариев
-        fresh_entryes = all_entryes[:5]  # Получить последние 5 статей по дате
-        tags = Tag.objects.all()[:10]  # Получить 10 тегов
-
-        # Применение пагинации, для реализации постраничного вывода
-
-        paginator = Paginator(all_entryes, 3)  # Показывать по 3 статей на странице. Можно передать параметр пользователь сам решит сколько ему покажется
-        page = request.GET.get('page')  # по умолчанию передаётся page в параметрах запроса, чтобы понять на какой мы сейчас странице
+        blogs = sidebar.get_blogs()  # Данные боковой панели берутся из кэша (см. sidebar.py)
+        all_entryes = Entry.published.feed()  # Получить опубликованные записи с предварительно загруженными
+        # блогом, авторами (вместе с пользователями) и тегами (см. EntryQuerySet.feed)
+        # Получить 5 статей с наибольшим числом комментариев (теги в баннере не выводятся)
+        most_entryes = Entry.published.feed(with_tags=False).order_by('-number_of_comments')[:5]
+        fresh_entryes = sidebar.get_recent_entries(limit=5)  # Получить последние 5 статей по дате
+        tags = sidebar.get_tags(10)  # Получить 10 тегов
+
+        # Применение пагинации по ключу (pub_date, id), для реализации постраничного вывода без COUNT(*) и OFFSET
+
+        paginator = KeysetPaginator(all_entryes, 3)  # Показывать по 3 статей на странице. Сортировка совпадает с Meta.ordering модели
+        cursor = request.GET.get('cursor')  # токен страницы передаётся в параметрах запроса вместо номера страницы
         try:
-            entryes = paginator.page(page)
-        except PageNotAnInteger:
-            # Если страница не является целым числом, показать первую страницу.
-            entryes = paginator.page(1)
-        except EmptyPage:
-            # Если страница выходит за пределы допустимого диапазона (например, 9999), показать последнюю страницу результатов.
-            entryes = paginator.page(paginator.num_pages)
+            entryes = paginator.page(cursor)
+        except InvalidCursor:
+            # Если токен повреждён, показать первую страницу.
+            entryes = paginator.page()
 
         return render(request, 'app/index.html', context={"blogs": blogs,
                                                           "most_entryes": most_entryes,
@@ -50,6 +53,11 @@ class IndexView(View):
                                                           })
 
 
+# Страница отдаётся заново только если изменилась её версия (см. conditional.py), иначе - 304 без рендеринга.
+# no-cache: браузер может хранить страницу, но перед показом обязан проверить её версию
+@method_decorator([cache_control(private=True, no_cache=True),
+                   condition(etag_func=conditional.blog_etag, last_modified_func=conditional.blog_last_modified)],
+                  name='get')
 class BlogView(TemplateView):
     template_name = 'app/blog.html'
 
@@ -58,17 +66,22 @@ class BlogView(TemplateView):
 
         # Аналог blog = Blog.objects.get(slug_name=kwargs["name"])
         blog = get_object_or_404(Blog, slug_name=kwargs["name"])  # Если в БД не было найдено объекта, то возвращается ошибка 404
-        blogs = Blog.objects.exclude(id=blog.id)
-        resent_posts = blog.entryes.all()[:3]  # Вывести последние 3 поста
+        blogs = [item for item in sidebar.get_blogs() if item['id'] != blog.id]
+        resent_posts = sidebar.get_recent_entries(blog.id, 3)  # Вывести последние 3 поста
         # Добавление данных блога в контекст под ключом 'blog', 'resent_posts'
         context['blog'] = blog
         context['blogs'] = blogs
-        context["blog_tags"] = Tag.objects.filter(entry__blog=blog).distinct()
+        context["blog_tags"] = sidebar.get_blog_tags(blog.id)
         context['resent_posts'] = resent_posts
+        context['posts'] = Entry.published.feed().filter(blog=blog)  # Черновики и отложенные статьи не выводятся
 
         return context
 
 
+@method_decorator([cache_control(private=True, no_cache=True),
+                   condition(etag_func=conditional.post_detail_etag,
+                             last_modified_func=conditional.post_detail_last_modified)],
+                  name='get')
 class PostDetailView(DetailView):
     model = Entry  # модель, которая будет браться за основу. В шаблоне можно получить данные из названия модели
     # с маленькой буквы (entry)
@@ -84,12 +97,33 @@ class PostDetailView(DetailView):
     # это суффикс у шаблона с префиксом по умолчанию '_detail') в нашем случае это будет
     # `app/entry_detail.html`, тогда template_name можно не прописывать, он сам возьмёт его
 
+    def get_queryset(self):
+        # Неопубликованные статьи видит только персонал сайта (предпросмотр). Выводится обработанный
+        # при сохранении body_html, исходный текст из редактора не нужен. Блог, авторы и теги - как в ленте
+        return conditional.visible_entries(self.request).with_related().defer('body_text')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        context["blog_entryes"] = self.get_queryset().filter(blog=context['entry'].blog).exclude(id=context['entry'].id)
-        context["blogs"] = Blog.objects.values('name', 'slug_name')
-        context["blog_tags"] = Tag.objects.filter(entry__blog=context['entry'].blog).distinct()
+        entry = context['entry']
+        # Последние 5 статей блога, кроме текущей: берём на одну больше на случай, если она среди них
+        context["blog_entryes"] = [item for item in sidebar.get_recent_entries(entry.blog_id, limit=6)
+                                   if item['id'] != entry.id][:5]
+        context["blogs"] = sidebar.get_blogs()
+        context["blog_tags"] = sidebar.get_blog_tags(entry.blog_id)
+
+        # Дерево комментариев строится одним запросом (см. comments.py), в шаблон
+        # передаются ветки обсуждения текущей страницы в виде плоских списков
+        comment_page = paginate_threads(build_comment_tree(entry),
+                                        self.request.GET.get('comments_page'))
+        context["comment_page"] = comment_page
+        context["comment_threads"] = [flatten_thread(root) for root in comment_page]
+
+        # Проверка, что пользователь автор и он числится среди авторов статьи или пользователь часть персонала сайта.
+        # Выполняется один раз, а не для каждого комментария в шаблоне, по уже загруженным авторам статьи
+        user = self.request.user
+        context["can_reply"] = user.is_staff or (
+                user.is_authenticated and any(author.user_id == user.pk for author in entry.authors.all()))
 
         return context
 
@@ -97,10 +131,11 @@ class PostDetailView(DetailView):
         form = CommentForm(data=request.POST)
         if form.is_valid():
             user = request.user
-            entry = self.get_object()
+            entry = self.get_object(conditional.visible_entries(request).only('id'))  # Нужен только id
             text = form.cleaned_data.get('text')
             parent = form.cleaned_data.get('parent')
-            Comment.objects.create(user=user, entry=entry, text=text, parent=parent)
+            with transaction.atomic():  # Комментарий и счётчик комментариев статьи сохраняются вместе (см. counters.py)
+                Comment.objects.create(user=user, entry=entry, text=text, parent=parent)
 
         return redirect('app:post-detail', slug=kwargs["slug"])
 
@@ -116,7 +151,7 @@ class PersonalAccountView(LoginRequiredMixin, PermissionRequiredMixin, TemplateV
         # if not self.request.user.has_perm('app.can_add_entry'):
         #     raise PermissionDenied(self.permission_denied_message)
         profile_author = get_object_or_404(AuthorProfile, user=self.request.user)  # Проверяем что есть профиль автора
-        entries = profile_author.entrys.all()
+        entries = profile_author.entrys.for_list()  # В таблицах выводятся только заголовок и дата
         comments = Comment.objects.filter(entry__in=entries).filter(parent__isnull=True).order_by('-created_at')[:5]
         context["profile_author"] = profile_author
         context["entries_published"] = entries.filter(status="published")
@@ -149,6 +184,76 @@ class PersonalAccountView(LoginRequiredMixin, PermissionRequiredMixin, TemplateV
 
 
 
+class EntryImageThumbnailView(View):
+    """
+    Уменьшенная копия картинки статьи заданной ширины. Создаётся при первом запросе
+    и далее отдаётся из дискового кэша (см. images.entry_thumbnail_path)
+    """
+    def get(self, request, width, name):
+        for _ in range(2):
+            try:
+                path = images.entry_thumbnail_path(name, width)
+                file = open(path, 'rb')
+                break
+            except images.ThumbnailNotFound:
+                raise Http404("Нет такой картинки")
+            except FileNotFoundError:
+                continue  # Копию между созданием и открытием вытеснил параллельный запрос - создаём заново
+        else:
+            raise Http404("Нет такой картинки")
+        response = FileResponse(file, content_type=mimetypes.guess_type(path)[0])
+        # Загруженные файлы не перезаписываются (хранилище подбирает новое имя), поэтому копию можно долго кэшировать
+        response['Cache-Control'] = 'public, max-age=2592000'
+        return response
+
+
+class SearchView(View):
+    """Страница поиска по статьям (см. search.py), ?q= - запрос, ?page= - номер страницы"""
+    per_page = 10
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        total, results = search.search(query, limit=self.per_page, offset=(page - 1) * self.per_page)
+        return render(request, 'app/search.html', context={"query": query,
+                                                           "results": results,
+                                                           "total": total,
+                                                           "page": page,
+                                                           "has_previous": page > 1,
+                                                           "has_next": page * self.per_page < total,
+                                                           "blogs": sidebar.get_blogs(),
+                                                           "fresh_entryes": sidebar.get_recent_entries(limit=5),
+                                                           "tags": sidebar.get_tags(10),
+                                                           })
+
+
+@method_decorator(etag_condition(conditional.search_json_etag), name='get')
+class EntrySearchJson(View):
+    """GET /entry/search/?q=...&limit=10&offset=0 - поиск по статьям в JSON, snippet - HTML с <mark>"""
+    max_limit = 50
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.GET.get('limit', 10)), 1), self.max_limit)
+            offset = max(int(request.GET.get('offset', 0)), 0)
+        except ValueError:
+            return json_response(request, {"message": "limit и offset должны быть числами"}, status=400)
+        query = request.GET.get('q', '').strip()
+        total, results = search.search(query, limit=limit, offset=offset)
+        return json_response(request, {"query": query,
+                                       "total": total,
+                                       "results": [{"entry_id": result.entry.id,
+                                                    "headline": result.entry.headline,
+                                                    "slug_headline": result.entry.slug_headline,
+                                                    "blog_name": result.entry.blog.name,
+                                                    "pub_date": result.entry.pub_date,
+                                                    "rank": result.rank,
+                                                    "snippet": result.snippet} for result in results]})
+
+
 class AboutView(TemplateView):
     template_name = 'app/about.html'
 
@@ -203,29 +308,85 @@ class LogoutView(View):
         return redirect("/")
 
 
+def parse_request_data(request):
+    """
+    Данные формы и файлы из тела PUT/PATCH запроса (Django разбирает тело только для POST).
+    multipart/form-data разбирается потоково стандартным MultiPartParser с обработчиками
+    загрузки из FILE_UPLOAD_HANDLERS: тело не читается в память целиком, а большие файлы
+    (больше FILE_UPLOAD_MAX_MEMORY_SIZE) сразу пишутся во временные файлы.
+    """
+    if request.content_type == 'multipart/form-data':
+        return request.parse_file_upload(request.META, request)
+    return QueryDict(request.body, encoding=request.encoding), MultiValueDict()
+
+
+def entries_for_json():
+    """Статьи с блогом, авторами и тегами для EntryJson: только нужные поля, связи одним запросом на каждую"""
+    return (Entry.objects
+            .select_related('blog')
+            .only('id', 'headline', 'summary', 'body_text', 'image', 'pub_date', 'status', 'blog__name')
+            .prefetch_related(Prefetch('authors', queryset=AuthorProfile.objects.select_related('user')
+                                       .only('id', 'user_id', 'user__username')),
+                              Prefetch('tags', queryset=Tag.objects.only('id', 'name'))))
+
+
+def entry_to_dict(entry):
+    return {"entry_id": entry.id,
+            "blog_name": entry.blog.name,
+            "headline": entry.headline,
+            "summary": entry.summary,
+            "body_text": entry.body_text,
+            "image": entry.image.url if entry.image else None,
+            "pub_date": entry.pub_date,
+            "status": entry.status,
+            "authors": [{"user_id": author.user_id, "name": author.user.username} for author in entry.authors.all()],
+            "tags": [{"id": tag.id, "name": tag.name} for tag in entry.tags.all()],
+            }
+
+
+def batch_ids(request, limit):
+    """id статей из ?ids=1,2,3 без повторов, в порядке запроса. ValueError - с текстом ошибки для ответа"""
+    try:
+        ids = list(dict.fromkeys(int(item) for item in request.GET.get('ids', '').split(',') if item.strip()))
+    except ValueError:
+        raise ValueError("ids - список id через запятую")
+    if not ids or len(ids) > limit:
+        raise ValueError(f"Укажите от 1 до {limit} id в параметре ids")
+    return ids
+
+
+def entry_json_etag(request, id=None):
+    # Версия - по mod_date запрошенных статей, без загрузки их самих (см. conditional.py)
+    try:
+        ids = [id] if id is not None else batch_ids(request, EntryJson.MAX_BATCH_IDS)
+    except ValueError:
+        return None
+    return conditional.entries_json_etag(request, ids)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(etag_condition(entry_json_etag), name='get')
 class EntryJson(View):
-    def get(self, request, id):
-        entry = Entry.objects.filter(id=id)
-        if entry:
-            entry = entry.first()
-            entry_dict = {"entry_id": entry.id,
-                          "blog_name": entry.blog.name,
-                          "headline": entry.headline,
-                          "summary": entry.summary,
-                          "body_text": entry.body_text,
-                          "image": entry.image.url,
-                          "pub_date": entry.pub_date,
-                          "status": entry.status,
-                          "authors": list(entry.authors.annotate(name=F("user__username")).values("user_id", "name")),
-                          "tags": list(entry.tags.values("id", "name")),
-                          }
-            return JsonResponse(entry_dict, safe=False,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4})
-        return JsonResponse({"message": "Нет такой записи"}, status=404,
-                            json_dumps_params={"ensure_ascii": False,
-                                               "indent": 4})
+    MAX_BATCH_IDS = 100
+
+    def get(self, request, id=None):
+        """
+        GET /entry/<id>/ - одна статья, GET /entry/?ids=1,2,3 - несколько статей.
+        В обоих случаях 3 запроса: статьи с блогами, авторы, теги (и один запрос версии для ETag).
+        """
+        if id is not None:
+            entry = entries_for_json().filter(id=id).first()
+            if entry is None:
+                return json_response(request, {"message": "Нет такой записи"}, status=404)
+            return json_response(request, entry_to_dict(entry))
+
+        try:
+            ids = batch_ids(request, self.MAX_BATCH_IDS)
+        except ValueError as e:
+            return json_response(request, {"message": str(e)}, status=400)
+        entries = entries_for_json().in_bulk(ids)
+        return json_response(request, {"entries": [entry_to_dict(entries[pk]) for pk in ids if pk in entries],
+                                       "not_found": [pk for pk in ids if pk not in entries]})
 
     def post(self, request):
         form = EntryForm(request.POST, request.FILES)
@@ -242,82 +403,46 @@ class EntryJson(View):
             entry.save()
             entry.authors.add(*form.cleaned_data.get("authors"))
             entry.tags.add(*form.cleaned_data.get("tags"))
-            return JsonResponse({'message': 'Пост успешно создан'},
-                                status=200,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4})
+            return json_response(request, {'message': 'Пост успешно создан'}, status=200)
 
-        return JsonResponse({"message": "Что-то пошло не так"}, status=400,
-                            json_dumps_params={"ensure_ascii": False,
-                                               "indent": 4})
+        return json_response(request, {"message": "Что-то пошло не так"}, status=400)
 
     def put(self, request, id):
-        # form = EntryForm(request.POST, request.FILES)
-        # Получите данные из PUT-запроса
-        put_data = request.body
-        boundary = request.content_params["boundary"]
-        parts = put_data.split(boundary.encode())
-        # Преобразуйте данные в словарь JSON
-        # data_dict = json.loads(put_data)
-
-        data_dict = MultiValueDict()
-        data_dict_file = MultiValueDict()
-
-        for part in parts:
-            if b'Content-Disposition: form-data' in part:
-                # Если часть содержит данные формы
-                headers, body = part.split(b'\r\n\r\n', 1)
-                name = headers.split(b'name="')[1].split(b'"')[0].decode('utf-8')
-                if name != 'image':
-                    value = body.strip(b'\r\n--').decode('utf-8')
-                    data_dict.appendlist(name, value)
-                else:
-                    filename, content_type = headers.split(b'filename="')[1].split(b'"')
-                    if filename:
-                        filename, content_type = filename.decode("utf-8"), content_type.split(b': ')[-1].decode("utf-8")
-                        file_data = body.strip(b'\r\n')
-                        file_io = io.BytesIO(file_data)
-                        image_file = InMemoryUploadedFile(file_io, None, filename, content_type, len(file_data), None)
-                        data_dict_file.appendlist(name, image_file)
-
-
-        # Создайте экземпляр формы и передайте данные
-        form = EntryForm(data_dict, data_dict_file)
-
-        if form.is_valid():
-            # Данные валидны, обработайте их
-            # ...
-            entry = get_object_or_404(Entry, id=id)
+        return self.update(request, id, partial=False)
 
-            # Обновляем поля экземпляра Entry на основе очищенных данных формы
-            for field in form.cleaned_data.keys():
-                if field not in ['authors', 'tags']:
-                    setattr(entry, field, form.cleaned_data.get(field))
+    def patch(self, request, id):
+        return self.update(request, id, partial=True)
 
-            # Сохраняем обновленный экземпляр Entry
-            entry.save()
+    def update(self, request, id, partial):
+        """
+        Изменение статьи. PUT - все поля формы, PATCH - только переданные.
+        Картинка, не переданная в запросе, остаётся прежней.
+        """
+        entry = get_object_or_404(Entry, id=id)
+        try:
+            data, files = parse_request_data(request)
+        except MultiPartParserError:
+            return json_response(request, {"message": "Некорректное тело запроса multipart/form-data"},
+                                 status=400)
 
-            entry.authors.set(form.cleaned_data.get("authors"))
-            entry.tags.set(form.cleaned_data.get("tags"))
+        form = EntryForm(data, files, instance=entry)
+        if partial:
+            for name in list(form.fields):
+                if name not in data and name not in files:
+                    del form.fields[name]
 
-            return JsonResponse({'message': 'Данные обработаны успешно'},
-                                status=200,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4})
+        if form.is_valid():
+            form.save()  # Сохраняет и поля статьи, и связи authors/tags
+            return json_response(request, {'message': 'Данные обработаны успешно'}, status=200)
 
-        return JsonResponse({"message": "Что-то пошло не так"}, status=400,
-                            json_dumps_params={"ensure_ascii": False,
-                                               "indent": 4})
+        return json_response(request, {"message": "Что-то пошло не так", "errors": form.errors},
+                             status=400)
 
     def delete(self, request, id):
         entry = Entry.objects.filter(id=id)
         if entry:
             entry.first().delete()
-            return JsonResponse({"message": "Успешное удаление"}, status=203,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4})
-        return JsonResponse({"message": "Нет такой записи"}, status=404,
-                            json_dumps_params={"ensure_ascii": False,
-                                               "indent": 4})
+            return json_response(request, {"message": "Успешное удаление"}, status=203)
+        return json_response(request, {"message": "Нет такой записи"}, status=404)
 
 
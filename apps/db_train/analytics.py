@@ -0,0 +1,118 @@
+"""
+Предварительно вычисленные ответы страницы тренировки запросов (TrainView).
+
+Все десять ответов считаются двумя сгруппированными запросами и одним запросом по индексу:
+- авторы: одна строка на автора с числом статей (Count) и стажем из профиля (LEFT JOIN),
+  из этих строк в Python получаются ответы 1, 2, 4 - 8, 10;
+- статьи с тегом 'Кино' или 'Музыка' - ответ 3;
+- id авторов младше YOUNG_AGE по диапазону date_birth (Author.objects.younger_than,
+  только индекс db_train_author_birth_idx) - какие строки авторов входят в ответ 9.
+Ответ 10 - список всех авторов, поэтому отдельные агрегаты по таблице авторов
+не уменьшили бы объём чтения, а добавили бы проходов по ней.
+
+Результат хранится в кэше 'default' вместе со временем вычисления (timings, мс): для каждого
+ответа - его собственная работа (свой запрос у ответов 3 и 9, обработка строк в Python у
+остальных), отдельно - общий для ответов запрос авторов ('authors') и всё вычисление ('total').
+Так время общего запроса не повторяется в каждом ответе. Инвалидация - через поколение кэша (apps/app/generations.py): при изменении Author,
+AuthorProfile, Entry, Tag или тегов статьи (см. signals.py) поколение меняется и ответы
+пересчитываются при следующем обращении. В ключ входит и текущая дата: возраст авторов
+вычисляется в БД на сегодня (Author.objects.with_age).
+"""
+import time
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db.models import Count, F
+from django.utils import timezone
+
+from apps.app.generations import CacheGeneration
+from .models import Author, Entry
+
+CACHE_ALIAS = 'default'
+ANSWERS_TIMEOUT = 3600  # Страховка на случай пропущенной инвалидации
+FEMALE = 'ж'
+TAGS = ('Кино', 'Музыка')
+STAGE_RANGE = (1, 5)
+YOUNG_AGE = 25
+
+_generation = CacheGeneration('db_train:analytics:generation', CACHE_ALIAS)
+get_generation = _generation.get  # Текущее поколение кэша ответов
+invalidate = _generation.invalidate  # Сбросить вычисленные ответы (сменой поколения)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _load_authors(today):
+    # Возраст вычисляется в БД на сегодня, хранимое поле age может быть устаревшим
+    return list(Author.objects.with_age(today)
+                .annotate(count=Count('entries'), stage=F('authorprofile__stage'))
+                .values('id', 'username', 'gender', 'self_esteem', 'phone_number', 'current_age', 'status_rule',
+                        'count', 'stage')
+                .order_by('id'))
+
+
+def _load_tagged_entries():
+    return list(Entry.objects.filter(tags__name__in=TAGS).values('id', 'text').distinct().order_by('id'))
+
+
+def _with_max(rows, field):
+    top = max((row[field] for row in rows if row[field] is not None), default=None)
+    return [row for row in rows if top is not None and row[field] == top], top
+
+
+def _timed(compute):
+    start = time.perf_counter()
+    result = compute()
+    return result, round((time.perf_counter() - start) * 1000, 3)
+
+
+def _percent(part, total):
+    return round(Decimal(part * 100) / total, 2) if total else None
+
+
+def compute_answers(today=None):
+    """
+    Вычислить ответы без кэша на дату today: (answers, timings). Ключи answers - 'answer1' ... 'answer10',
+    timings - те же и 'authors' (общий запрос авторов), 'total' (всё вычисление).
+    """
+    today = today or timezone.localdate()
+    start = time.perf_counter()
+    authors, authors_ms = _timed(lambda: _load_authors(today))
+
+    def young():
+        ids = set(Author.objects.younger_than(YOUNG_AGE, today).values_list('id', flat=True))
+        return [row for row in authors if row['id'] in ids]
+
+    steps = {
+        'answer1': lambda: _with_max(authors, 'self_esteem')[0],
+        'answer2': lambda: next(iter(_with_max(authors, 'count')[0]), None),
+        'answer3': _load_tagged_entries,
+        'answer4': lambda: sum(row['gender'] == FEMALE for row in authors),
+        'answer5': lambda: _percent(sum(row['status_rule'] for row in authors), len(authors)),
+        'answer6': lambda: [row for row in authors
+                            if row['stage'] is not None and STAGE_RANGE[0] <= row['stage'] <= STAGE_RANGE[1]],
+        'answer7': lambda: _with_max(authors, 'current_age')[1],
+        'answer8': lambda: sum(bool(row['phone_number']) for row in authors),
+        'answer9': young,
+        'answer10': lambda: [{'username': row['username'], 'count': row['count']} for row in authors],
+    }
+    answers, timings = {}, {'authors': authors_ms}
+    for name, compute in steps.items():
+        answers[name], timings[name] = _timed(compute)
+    timings['total'] = round((time.perf_counter() - start) * 1000, 3)
+    return answers, timings
+
+
+def get_answers():
+    """Ответы и время их вычисления из кэша; при промахе - пересчёт. Возвращает (answers, timings, cached)"""
+    cache = _cache()
+    today = timezone.localdate()
+    key = f"db_train:analytics:{get_generation()}:{today.isoformat()}"  # Возраст меняется со сменой даты
+    value = cache.get(key)
+    if value is not None:
+        return *value, True
+    value = compute_answers(today)
+    cache.set(key, value, ANSWERS_TIMEOUT)
+    return *value, False
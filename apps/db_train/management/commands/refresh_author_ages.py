@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.db_train import analytics
+from apps.db_train.models import Author
+
+
+class Command(BaseCommand):
+    help = "Пересчитать хранимый возраст авторов одним UPDATE (запускать раз в сутки, например из cron)"
+
+    def handle(self, *args, **options):
+        count = Author.objects.refresh_ages()
+        if count:
+            analytics.invalidate()  # UPDATE не вызывает сигналы сохранения
+        self.stdout.write(self.style.SUCCESS(f"Обновлён возраст авторов: {count}"))
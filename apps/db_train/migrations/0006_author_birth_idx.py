@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-17 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db_train', '0005_tag_entry_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['date_birth'], name='db_train_author_birth_idx'),
+        ),
+    ]
@@ -1,6 +1,56 @@
 from django.db import models
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import ExtractYear
 from django.core.validators import RegexValidator,MinValueValidator, MaxValueValidator
-from datetime import datetime
+from django.utils import timezone
+
+
+def age_on(date_birth, today):
+    """Полных лет на дату today"""
+    # Добавка: был ли уже день рождения в этом году? Если не был, то 1, если был, то 0
+    additional_year = (today.month, today.day) < (date_birth.month, date_birth.day)
+    return today.year - date_birth.year - additional_year
+
+
+def shift_years(day, years):
+    """Та же дата years лет назад/вперёд; 29 февраля в невисокосный год - 28 февраля"""
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        return day.replace(year=day.year + years, day=28)
+
+
+class AuthorQuerySet(models.QuerySet):
+    """
+    Возраст, вычисляемый в БД на текущую дату, а не хранимое поле age, которое
+    устаревает в каждый день рождения.
+
+    Фильтры по возрасту переводятся в диапазоны date_birth и используют индекс
+    по этому полю; with_age() нужен, когда возраст надо вывести или сгруппировать.
+    """
+
+    @staticmethod
+    def age_expression(today):
+        """Выражение полных лет на дату today по полю date_birth"""
+        birthday_ahead = Q(date_birth__month__gt=today.month) | Q(date_birth__month=today.month,
+                                                                   date_birth__day__gt=today.day)
+        return (Value(today.year) - ExtractYear('date_birth')
+                - Case(When(birthday_ahead, then=Value(1)), default=Value(0)))
+
+    def with_age(self, today=None):
+        """Добавить вычисленный в БД возраст как current_age (NULL без даты рождения)"""
+        return self.annotate(current_age=self.age_expression(today or timezone.localdate()))
+
+    def younger_than(self, age, today=None):
+        """Авторы младше age лет: родились позже, чем age лет назад"""
+        return self.filter(date_birth__gt=shift_years(today or timezone.localdate(), -age))
+
+    def refresh_ages(self, today=None):
+        """Пересчитать хранимое поле age одним UPDATE, только у устаревших строк. Вернуть их количество"""
+        age = self.age_expression(today or timezone.localdate())
+        return self.filter(date_birth__isnull=False).exclude(age=age).update(age=age)
+
+
 # Создайте свои модели здесь
 class Author(models.Model):
     phone_regex = RegexValidator(
@@ -107,16 +157,19 @@ class Author(models.Model):
             initials = f"{self.first_name.upper()[0]}.{self.middle_name.upper()[0]}."
         return f"{self.username} - {self.last_name} {initials}"
 
+    objects = AuthorQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Автор"
         verbose_name_plural = "Авторы"
+        indexes = [
+            models.Index(fields=['date_birth'], name='db_train_author_birth_idx'),  # Фильтры по возрасту
+        ]
 
     def save(self, *args, **kwargs):
-        if self.date_birth:  # Если известен день рождения
-            today = datetime.today()  # Определяем текущие параметры даты
-            # Определяем добавку, был ли уже день рождения в этом году? Если не был, то 1, если был, то 0
-            additional_year = (today.month, today.day) < (self.date_birth.month, self.date_birth.day)
-            self.age = today.year - self.date_birth.year - additional_year  # Перезаписываем значение
+        # Хранимый возраст - только для вывода, на дату сохранения. Актуальным его держит команда
+        # refresh_author_ages, а запросы по возрасту используют Author.objects.with_age() / younger_than()
+        self.age = age_on(self.date_birth, timezone.localdate()) if self.date_birth else None
         super().save(*args, **kwargs)
 
 
@@ -0,0 +1,19 @@
+"""
+Обработчики сигналов моделей приложения. Подключаются в apps.py (метод ready).
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import analytics
+from .models import Author, AuthorProfile, Entry, Tag
+
+
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=AuthorProfile)
+@receiver([post_save, post_delete], sender=Entry)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(m2m_changed, sender=Entry.tags.through)
+def invalidate_analytics(sender, **kwargs):
+    # После фиксации транзакции, иначе параллельный запрос закэширует старые ответы
+    transaction.on_commit(analytics.invalidate)
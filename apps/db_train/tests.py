@@ -1,3 +1,81 @@
+from datetime import date
+
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+
+from . import analytics
+from .models import Author, AuthorProfile, Entry, Tag
+
+
+class AuthorAgeTests(TestCase):
+    """Возраст авторов на дату запроса, а не на дату сохранения (см. AuthorQuerySet)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        births = {'birthday_today': date(1999, 5, 1), 'birthday_tomorrow': date(1999, 5, 2),
+                  'leap_day': date(2000, 2, 29), 'older': date(1980, 1, 1), 'no_birth': None}
+        for username, date_birth in births.items():
+            Author.objects.create(username=username, email=f"{username}@example.com", date_birth=date_birth,
+                                  status_rule=True)
+
+    def test_younger_than(self):
+        today = date(2024, 5, 1)
+        ages = dict(Author.objects.with_age(today).values_list('username', 'current_age'))
+        self.assertEqual(ages, {'birthday_today': 25, 'birthday_tomorrow': 24, 'leap_day': 24, 'older': 44,
+                                'no_birth': None})
+        self.assertEqual(sorted(Author.objects.younger_than(25, today).values_list('username', flat=True)),
+                         ['birthday_tomorrow', 'leap_day'])
+        answers, _ = analytics.compute_answers(today)
+        self.assertEqual(sorted(row['username'] for row in answers['answer9']), ['birthday_tomorrow', 'leap_day'])
+        self.assertEqual(answers['answer7'], 44)
+
+    def test_refresh_ages(self):
+        self.assertEqual(Author.objects.refresh_ages(date(2024, 5, 1)), 4)
+        self.assertEqual(Author.objects.get(username='birthday_today').age, 25)
+        self.assertEqual(Author.objects.refresh_ages(date(2024, 5, 1)), 0)  # Обновляются только устаревшие
+
+
+class AnswersCacheTests(TestCase):
+    """Кэш ответов страницы тренировки и его сброс сигналами (см. analytics.py и signals.py)"""
+
+    def setUp(self):
+        caches[analytics.CACHE_ALIAS].clear()
+        self.author = Author.objects.create(username='ann', email="ann@example.com", status_rule=True)
+        self.entry = Entry.objects.create(text="Статья", author=self.author)
+        self.tag = Tag.objects.create(name="Кино")
+
+    def test_timings(self):
+        answers, timings, cached = analytics.get_answers()
+        self.assertFalse(cached)
+        self.assertEqual(set(timings), {*answers, 'authors', 'total'})
+        self.assertGreaterEqual(timings['total'], sum(timings[name] for name in answers))
+
+    def test_page(self):
+        response = self.client.get(reverse('train:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f"Время: {response.context['timings']['answer3']} мс")
+        self.assertFalse(response.context['from_cache'])
+        self.assertTrue(self.client.get(reverse('train:index')).context['from_cache'])
+
+    def test_cache_hit(self):
+        answers, timings, _ = analytics.get_answers()
+        with self.assertNumQueries(0):
+            self.assertEqual(analytics.get_answers(), (answers, timings, True))
+
+    def test_invalidation(self):
+        def tag_entry():
+            self.entry.tags.add(self.tag)
 
-# Create your tests here.
+        changes = [lambda: Author.objects.create(username='bob', email="bob@example.com", status_rule=True),
+                   lambda: AuthorProfile.objects.create(author=self.author, stage=3),
+                   lambda: Entry.objects.create(text="Ещё статья", author=self.author),
+                   lambda: Tag.objects.create(name="Музыка"),
+                   tag_entry,
+                   lambda: self.tag.delete()]
+        for number, change in enumerate(changes):
+            with self.subTest(change=number):
+                analytics.get_answers()
+                with self.captureOnCommitCallbacks(execute=True):  # Поколение меняется после фиксации
+                    change()
+                self.assertFalse(analytics.get_answers()[2])
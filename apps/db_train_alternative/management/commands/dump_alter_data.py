@@ -0,0 +1,89 @@
+"""
+Потоковая выгрузка таблиц приложения db_train_alternative в файлы формата project/data/alter
+(blogs, authors, authors_profile, tags, entrys), которые затем читает load_alter_data.
+
+Строки читаются из БД через .iterator(chunk_size=...) и сразу пишутся в файл (см. streaming.py),
+поэтому потребление памяти не зависит от количества строк.
+
+Запуск: python manage.py dump_alter_data [путь к папке] [--format json|jsonl] [--chunk-size 2000]
+"""
+import os
+from time import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.db_train_alternative.models import Blog, Author, AuthorProfile, Entry, Tag
+from apps.db_train_alternative.streaming import write_records, FORMATS, JSON
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка блогов, авторов, профилей, тегов и статей в JSON / JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            default=os.path.join(settings.BASE_DIR, 'project', 'data', 'alter'))
+        parser.add_argument('--format', choices=FORMATS, default=JSON,
+                            help="json - массив (как в project/data/alter), jsonl - одна запись на строку")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Количество строк, читаемых из БД за один раз")
+
+    def handle(self, *args, **options):
+        self.path = options['path']
+        self.fmt = options['format']
+        self.chunk_size = options['chunk_size']
+        os.makedirs(self.path, exist_ok=True)
+
+        self.dump('blogs', Blog.objects.order_by('id').values('name', 'tagline').iterator(self.chunk_size))
+        self.dump('authors', Author.objects.order_by('id').values('name', 'email').iterator(self.chunk_size))
+        self.dump('authors_profile', self.author_profiles())
+
+        # В entrys.json теги указываются номерами (с 1) по порядку tags.json
+        self.tag_numbers = {}
+        self.dump('tags', self.tags())
+        self.dump('entrys', self.entries())
+
+    def dump(self, name, records):
+        t1 = time()
+        filename = os.path.join(self.path, f"{name}.{self.fmt}")
+        count = write_records(filename, records, self.fmt)
+        t2 = time()
+        self.stdout.write(f"Файл '{filename}' записан. Время выгрузки {count} строк {t2 - t1:.4f} с")
+
+    def author_profiles(self):
+        profiles = (AuthorProfile.objects.order_by('id')
+                    .values('author__name', 'bio', 'phone_number', 'city')
+                    .iterator(self.chunk_size))
+        for row in profiles:
+            yield {"author": row["author__name"],
+                   "bio": row["bio"],
+                   "phone_number": row["phone_number"],
+                   "city": row["city"]}
+
+    def tags(self):
+        tags = Tag.objects.order_by('id').values('id', 'name', 'slug_name').iterator(self.chunk_size)
+        for number, row in enumerate(tags, start=1):
+            self.tag_numbers[row.pop('id')] = number
+            yield row
+
+    def entries(self):
+        # prefetch_related вместе с iterator() выполняется для каждой пачки из chunk_size строк
+        entries = (Entry.objects.order_by('id')
+                   .select_related('blog', 'author')
+                   .only('headline', 'body_text', 'pub_date', 'number_of_comments',
+                         'number_of_pingbacks', 'rating', 'blog__name', 'author__name')
+                   .prefetch_related(Prefetch('tags', queryset=Tag.objects.only('id')))
+                   .iterator(self.chunk_size))
+        for entry in entries:
+            pub_date = timezone.localtime(entry.pub_date) if timezone.is_aware(entry.pub_date) else entry.pub_date
+            yield {"blog": entry.blog.name,
+                   "headline": entry.headline,
+                   "body_text": entry.body_text,
+                   "pub_date": pub_date.strftime("%Y-%m-%d %H:%M:%S"),
+                   "author": entry.author.name,
+                   "number_of_comments": entry.number_of_comments,
+                   "number_of_pingbacks": entry.number_of_pingbacks,
+                   "rating": entry.rating,
+                   "tags": [self.tag_numbers[tag.id] for tag in entry.tags.all()]}
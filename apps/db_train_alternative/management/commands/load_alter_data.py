@@ -0,0 +1,166 @@
+"""
+Пакетная загрузка данных из project/data/alter в таблицы приложения db_train_alternative.
+
+В отличие от построчного заполнения (full_clean() + save() и get() на каждую запись):
+- внешние ключи разрешаются по словарям имя -> id, построенным одним запросом;
+- проверка полей выполняется без запросов к БД, а уникальность - одним запросом на пачку;
+- запись идёт через bulk_create пачками по --chunk-size строк, каждая пачка в своей транзакции;
+- связи многие-ко-многим (Entry.tags) пишутся напрямую в промежуточную таблицу через bulk_create;
+- файлы читаются лениво (см. streaming.py), в памяти одновременно находится только одна пачка.
+
+Запуск: python manage.py load_alter_data [путь к папке] [--format json|jsonl] [--chunk-size 1000]
+"""
+import os
+from itertools import islice
+from time import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.db_train_alternative.models import Blog, Author, AuthorProfile, Entry, Tag
+from apps.db_train_alternative.streaming import iter_records, FORMATS, JSON
+
+
+def chunked(iterable, size):
+    """Разбить последовательность на списки по size элементов"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = "Пакетная загрузка блогов, авторов, профилей, тегов и статей из JSON файлов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            default=os.path.join(settings.BASE_DIR, 'project', 'data', 'alter'),
+                            help="Папка с файлами blogs, authors, authors_profile, tags, entrys")
+        parser.add_argument('--format', choices=FORMATS, default=JSON,
+                            help="Расширение файлов: json - массив, jsonl - одна запись на строку")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Количество строк в одной пачке (и транзакции)")
+
+    def handle(self, *args, **options):
+        self.path = options['path']
+        self.chunk_size = options['chunk_size']
+        self.fmt = options['format']
+        if self.chunk_size < 1:
+            raise CommandError("--chunk-size должен быть положительным")
+
+        self.load('blogs', Blog, lambda data: Blog(**data))
+        self.load('authors', Author, lambda data: Author(**data))
+
+        author_ids = dict(Author.objects.values_list('name', 'id'))  # Один запрос вместо get() на каждую запись
+        self.load('authors_profile', AuthorProfile,
+                  lambda data: AuthorProfile(author_id=self.resolve(author_ids, data, 'author'),
+                                             bio=data["bio"],
+                                             phone_number=data["phone_number"],
+                                             city=data["city"]))
+
+        self.load('tags', Tag, lambda data: Tag(**data))
+
+        # В entrys.json теги указаны номерами (с 1) по порядку tags.json - переводим их в id по названию тега
+        tag_ids_by_name = dict(Tag.objects.values_list('name', 'id'))
+        tag_ids = {number: tag_ids_by_name[data["name"]]
+                   for number, data in enumerate(self.read('tags'), start=1)}
+        blog_ids = dict(Blog.objects.values_list('name', 'id'))
+        self.load('entrys', Entry, lambda data: self.build_entry(data, blog_ids, author_ids, tag_ids),
+                  after_insert=lambda objs, chunk: self.insert_entry_tags(objs, chunk, tag_ids))
+
+    def read(self, name):
+        return iter_records(os.path.join(self.path, f"{name}.{self.fmt}"))
+
+    def load(self, name, model, build, after_insert=None):
+        t1 = time()
+        total = 0
+        for chunk in chunked(self.read(name), self.chunk_size):
+            objs = []
+            for index, data in enumerate(chunk, start=total):
+                try:
+                    objs.append(build(data))
+                except ValueError as e:
+                    raise CommandError(f"Ошибка в записи {index} таблицы '{model.__name__}': {e}")
+            self.validate(model, objs, offset=total)
+            with transaction.atomic():
+                model.objects.bulk_create(objs)
+                if after_insert is not None:
+                    after_insert(objs, chunk)
+            total += len(objs)
+        t2 = time()
+        self.stdout.write(f"Записи таблицы '{model.__name__}' успешно созданы. "
+                          f"Время создания {total} строк {t2 - t1:.4f} с")
+
+    def validate(self, model, objs, offset):
+        """
+        Проверка пачки объектов. full_clean() на каждый объект проверял бы уникальность
+        и существование внешних ключей запросами к БД, поэтому:
+        - поля проверяются без запросов (внешние ключи уже взяты из словарей id);
+        - уникальность проверяется одним запросом на каждое уникальное поле для всей пачки.
+        """
+        errors = {}
+        foreign_keys = [field.name for field in model._meta.concrete_fields if field.is_relation]
+        for index, obj in enumerate(objs):
+            try:
+                obj.full_clean(exclude=foreign_keys, validate_unique=False)
+            except ValidationError as e:
+                errors.setdefault(offset + index, []).append(str(e.message_dict))
+
+        for field in model._meta.concrete_fields:
+            if not field.unique or field.primary_key:
+                continue
+            values = {}
+            for index, obj in enumerate(objs):
+                value = getattr(obj, field.attname)
+                if value is None:
+                    continue
+                if value in values:
+                    errors.setdefault(offset + index, []).append(f"{field.name}={value!r} повторяется в данных")
+                values[value] = index
+            existing = model.objects.filter(**{f"{field.attname}__in": list(values)}) \
+                .values_list(field.attname, flat=True)
+            for value in existing:
+                errors.setdefault(offset + values[value], []).append(f"{field.name}={value!r} уже есть в БД")
+
+        if errors:
+            details = "\n".join(f"  запись {index}: {'; '.join(messages)}" for index, messages in sorted(errors.items()))
+            raise CommandError(f"Ошибки проверки данных таблицы '{model.__name__}':\n{details}")
+
+    def resolve(self, ids, data, key):
+        try:
+            return ids[data[key]]
+        except KeyError:
+            raise CommandError(f"Не найдено значение {key}={data.get(key)!r} для записи {data}")
+
+    def build_entry(self, data, blog_ids, author_ids, tag_ids):
+        # pub_date в моделях объявлен как DateTimeField, поэтому на вход необходимо подавать объект datetime.
+        # parse_datetime возвращает None для строки не в формате даты и бросает ValueError для
+        # несуществующей даты - в обоих случаях load() сообщит номер записи
+        pub_date = parse_datetime(data["pub_date"]) if data["pub_date"] is not None else timezone.now()
+        if pub_date is None:
+            raise ValueError(f"pub_date={data['pub_date']!r} не является датой и временем")
+        if timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)  # добавляем данных о часовом поясе
+        entry = Entry(blog_id=self.resolve(blog_ids, data, 'blog'),
+                      headline=data["headline"],
+                      body_text=data["body_text"],
+                      pub_date=pub_date,
+                      author_id=self.resolve(author_ids, data, 'author'),
+                      number_of_comments=data["number_of_comments"],
+                      number_of_pingbacks=data["number_of_pingbacks"],
+                      rating=data["rating"] if data["rating"] is not None else 0.0)
+        for number in data["tags"]:
+            if number not in tag_ids:
+                raise CommandError(f"Не найдено значение tags={number!r} для записи {data}")
+        return entry
+
+    def insert_entry_tags(self, objs, chunk, tag_ids):
+        """Строки промежуточной таблицы Entry.tags для всей пачки одним bulk_create"""
+        through = Entry.tags.through
+        rows = [through(entry_id=obj.id, tag_id=tag_ids[number])
+                for obj, data in zip(objs, chunk)
+                for number in data["tags"]]  # Номера тегов проверены в build_entry
+        through.objects.bulk_create(rows)
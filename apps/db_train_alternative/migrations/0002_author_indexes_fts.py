@@ -0,0 +1,75 @@
+# Generated by Django 4.2.9 on 2026-10-17 15:54
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+import django.db.models.functions.comparison
+
+# Полнотекстовый индекс авторов для поиска подстроки (apps.api.filters.FTS5SearchFilter).
+# Таблица FTS5 с токенизатором trigram хранит только индекс (content= ссылается на таблицу авторов),
+# а триггеры обновляют его при любом изменении, в том числе через bulk_create/bulk_update/update().
+# Создаётся только в SQLite с поддержкой FTS5 trigram (3.34+), иначе поиск работает через icontains.
+FTS_TABLE = 'db_train_alternative_author_fts'
+AUTHOR_TABLE = 'db_train_alternative_author'
+
+CREATE_FTS = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, email, content='{AUTHOR_TABLE}', content_rowid='id', tokenize='trigram')""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {AUTHOR_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {AUTHOR_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {AUTHOR_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO {FTS_TABLE}(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts_trigram_check USING fts5(x, tokenize='trigram')")
+            cursor.execute("DROP TABLE temp.fts_trigram_check")
+        except OperationalError:
+            return  # SQLite без FTS5 или без токенизатора trigram
+        for sql in CREATE_FTS:
+            cursor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in DROP_FTS:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db_train_alternative', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['name', 'id'], name='dbta_author_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(django.db.models.functions.comparison.Collate('email', 'NOCASE'), name='dbta_author_email_nocase_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
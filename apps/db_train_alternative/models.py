@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Collate
 from datetime import date, datetime
 from django.core.validators import RegexValidator
 
@@ -40,6 +41,13 @@ class Author(models.Model):
     class Meta:
         verbose_name = "Автор"
         verbose_name_plural = "Авторы"
+        indexes = [
+            # Фильтр ?name= и сортировка/курсор по (name, id) в AuthorViewSet
+            models.Index(fields=['name', 'id'], name='dbta_author_name_id_idx'),
+            # Поиск email без учёта регистра (iexact, istartswith - в SQLite это LIKE, который использует
+            # индекс только с правилом сравнения NOCASE)
+            models.Index(Collate('email', 'NOCASE'), name='dbta_author_email_nocase_idx'),
+        ]
 
 
 class AuthorProfile(models.Model):
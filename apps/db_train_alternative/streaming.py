@@ -0,0 +1,118 @@
+"""
+Потоковая запись и чтение наборов данных (списков словарей) в JSON и JSON Lines.
+
+Запись идёт по одной записи, поэтому в памяти не нужно держать весь список:
+- json  - массив в том же виде, что и файлы в project/data/alter (отступ 4 пробела);
+- jsonl - JSON Lines, одна запись на строку.
+
+Чтение (iter_records) тоже ленивое: файл читается блоками и записи отдаются
+по мере разбора, без json.load всего файла. Формат определяется по первому
+символу: '[' - JSON массив, иначе JSON Lines.
+"""
+import json
+import textwrap
+
+JSON = 'json'
+JSONL = 'jsonl'
+FORMATS = (JSON, JSONL)
+
+
+class JsonStreamWriter:
+    """
+    Запись последовательности словарей в открытый текстовый файл.
+    Использование:
+        with JsonStreamWriter(f, 'json') as writer:
+            for record in records:
+                writer.write(record)
+    """
+
+    def __init__(self, file, fmt=JSON):
+        if fmt not in FORMATS:
+            raise ValueError(f"Неизвестный формат {fmt!r}, допустимы: {', '.join(FORMATS)}")
+        self.file = file
+        self.fmt = fmt
+        self.count = 0
+
+    def __enter__(self):
+        if self.fmt == JSON:
+            self.file.write("[")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.fmt == JSON:
+            self.file.write("\n]" if self.count else "]")
+
+    def write(self, record):
+        if self.fmt == JSONL:
+            self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            self.file.write("\n")
+        else:
+            self.file.write(",\n" if self.count else "\n")
+            self.file.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=4), "    "))
+        self.count += 1
+
+
+def write_records(path, records, fmt=JSON):
+    """Записать records в файл path, вернуть количество записей"""
+    with open(path, "w", encoding="utf-8") as f:
+        with JsonStreamWriter(f, fmt) as writer:
+            for record in records:
+                writer.write(record)
+    return writer.count
+
+
+def iter_records(path, block_size=64 * 1024):
+    """Лениво читать записи из файла JSON массива или JSON Lines"""
+    with open(path, encoding="utf-8") as f:
+        first = ""
+        while not first:
+            block = f.read(block_size)
+            if not block:
+                return
+            first = block.lstrip()
+        if first[0] == "[":
+            yield from _iter_array(f, first[1:], block_size)
+        else:
+            yield from _iter_lines(f, first)
+
+
+def _iter_lines(f, head):
+    # Первый блок уже прочитан, дочитываем его строку и идём построчно по файлу
+    lines = (head + f.readline()).splitlines()
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_array(f, buffer, block_size):
+    decoder = json.JSONDecoder()
+    position = 0
+    eof = False
+    while True:
+        # Пропускаем пробелы и запятые между элементами
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if buffer[position] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # Значение, упёршееся в конец буфера (например, число), могло быть прочитано не полностью
+                if end < len(buffer) or eof:
+                    yield record
+                    position = end
+                    continue
+        elif eof:
+            raise ValueError(f"Неожиданный конец файла {f.name}: нет закрывающей ']'")
+        # Отбрасываем разобранную часть буфера и дочитываем следующий блок
+        block = f.read(block_size)
+        eof = not block
+        buffer = buffer[position:] + block
+        position = 0
@@ -1,3 +1,179 @@
+import io
+import os
+import tempfile
+from datetime import datetime
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
+from django.utils import timezone
+
+from .models import Author, AuthorProfile, Blog, Entry, Tag
+from .streaming import FORMATS, JSON, JSONL, JsonStreamWriter, iter_records, write_records
+
+BLOGS = [{"name": "Путешествия", "tagline": "О поездках"},
+         {"name": "Кулинария", "tagline": "О еде"}]
+AUTHORS = [{"name": "ann", "email": "ann@example.com"},
+           {"name": "bob", "email": "bob@example.com"},
+           {"name": "kate", "email": "kate@example.com"}]
+PROFILES = [{"author": "bob", "bio": "О себе", "phone_number": "+79123456789", "city": "Москва"}]
+TAGS = [{"name": "Горы", "slug_name": "gory"},
+        {"name": "Море", "slug_name": "more"},
+        {"name": "Выпечка", "slug_name": "vypechka"}]
+
+
+def entry(blog, author, tags, pub_date="2024-05-01 10:00:00"):
+    return {"blog": blog, "headline": f"Статья {author}", "body_text": "Текст", "pub_date": pub_date,
+            "author": author, "number_of_comments": 1, "number_of_pingbacks": 0, "rating": None, "tags": tags}
+
+
+ENTRIES = [entry("Путешествия", "ann", [1, 2]),
+           entry("Кулинария", "bob", [3]),
+           entry("Путешествия", "kate", []),
+           entry("Кулинария", "ann", [2, 3], pub_date=None)]
+
+
+class LoadAlterDataTests(TestCase):
+    """Пакетная загрузка management-командой load_alter_data"""
+
+    def setUp(self):
+        # Лишний тег сдвигает id, чтобы номера тегов из файла не совпадали с id в БД
+        Tag.objects.create(name="Лишний", slug_name="lishniy")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.write(blogs=BLOGS, authors=AUTHORS, authors_profile=PROFILES, tags=TAGS, entrys=ENTRIES)
+
+    def write(self, **files):
+        for name, records in files.items():
+            write_records(os.path.join(self.tmpdir.name, f"{name}.json"), records)
+
+    def reset(self):
+        # Для нескольких загрузок в одном тесте: удаляем всё записанное предыдущей
+        Blog.objects.all().delete()
+        Author.objects.all().delete()
+        Tag.objects.exclude(name="Лишний").delete()
+
+    def load(self):
+        call_command('load_alter_data', self.tmpdir.name, chunk_size=2, stdout=io.StringIO())
+
+    def test_load(self):
+        self.load()
+        self.assertEqual(Blog.objects.count(), 2)
+        self.assertEqual(Author.objects.count(), 3)
+        self.assertEqual(AuthorProfile.objects.get().author.name, "bob")
+        entries = Entry.objects.order_by('id').select_related('blog', 'author').prefetch_related('tags')
+        self.assertEqual([(item.blog.name, item.author.name, sorted(tag.name for tag in item.tags.all()))
+                          for item in entries],
+                         [("Путешествия", "ann", ["Горы", "Море"]),
+                          ("Кулинария", "bob", ["Выпечка"]),
+                          ("Путешествия", "kate", []),
+                          ("Кулинария", "ann", ["Выпечка", "Море"])])
+        self.assertEqual(entries[0].rating, 0.0)
+
+    def test_duplicate_values(self):
+        self.write(authors=AUTHORS + [{"name": "max", "email": "kate@example.com"}])
+        with self.assertRaisesRegex(CommandError, r"запись 3: email='kate@example.com' повторяется"):
+            self.load()
+        self.assertEqual(Author.objects.count(), 2)  # Первая пачка записана в своей транзакции
+
+    def test_existing_values(self):
+        Blog.objects.create(name="Кулинария", tagline="Уже есть")
+        with self.assertRaisesRegex(CommandError, r"запись 1: name='Кулинария' уже есть в БД"):
+            self.load()
+
+    def test_unknown_values(self):
+        cases = [(dict(authors_profile=[dict(PROFILES[0], author="nobody")]), r"author='nobody'"),
+                 (dict(entrys=ENTRIES + [entry("Нет такого", "ann", [])]), r"blog='Нет такого'"),
+                 (dict(entrys=ENTRIES + [entry("Кулинария", "ann", [1, 4])]), r"tags=4")]
+        for files, message in cases:
+            with self.subTest(message=message):
+                self.reset()
+                self.write(**dict(dict(authors_profile=PROFILES, entrys=ENTRIES), **files))
+                with self.assertRaisesRegex(CommandError, f"Не найдено значение {message}"):
+                    self.load()
+
+    def test_invalid_pub_date(self):
+        for pub_date in ["вчера", "2024-02-30 10:00:00"]:
+            with self.subTest(pub_date=pub_date):
+                self.reset()
+                self.write(entrys=ENTRIES + [entry("Кулинария", "ann", [], pub_date=pub_date)])
+                with self.assertRaisesRegex(CommandError, r"Ошибка в записи 4 таблицы 'Entry'"):
+                    self.load()
+
+
+class StreamingTests(TestCase):
+    """Потоковая запись и чтение JSON / JSON Lines (см. streaming.py) и команда dump_alter_data"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_round_trip(self):
+        # block_size=1 - каждое значение (в том числе числа и строки с экранированием) рвётся между блоками
+        records = [{"name": "Горы \"и\" море", "rating": 12.5, "tags": [1, 22]}, {"empty": None}, {"n": 1000}]
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                path = self.path(f"records.{fmt}")
+                self.assertEqual(write_records(path, records, fmt), 3)
+                for block_size in (1, 7, 64 * 1024):
+                    self.assertEqual(list(iter_records(path, block_size=block_size)), records)
+
+    def test_empty(self):
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                path = self.path(f"empty.{fmt}")
+                self.assertEqual(write_records(path, [], fmt), 0)
+                self.assertEqual(list(iter_records(path, block_size=1)), [])
+        with open(self.path("spaces.json"), "w") as f:
+            f.write("  [ \n ]  ")
+        self.assertEqual(list(iter_records(self.path("spaces.json"), block_size=1)), [])
+
+    def test_writer_format(self):
+        file = io.StringIO()
+        with JsonStreamWriter(file, JSON) as writer:
+            writer.write({"a": 1})
+            writer.write({"b": "б"})
+        self.assertEqual(file.getvalue(), '[\n    {\n        "a": 1\n    },\n    {\n        "b": "б"\n    }\n]')
+        with self.assertRaises(ValueError):
+            JsonStreamWriter(file, 'xml')
+
+    def test_missing_bracket(self):
+        with open(self.path("broken.json"), "w") as f:
+            f.write('[{"a": 1}, {"b": 2}')
+        records = iter_records(self.path("broken.json"), block_size=1)
+        with self.assertRaisesRegex(ValueError, "нет закрывающей"):
+            list(records)
+
+    def test_dump_and_load(self):
+        blog = Blog.objects.create(name="Блог", tagline="Слоган")
+        author = Author.objects.create(name="ann", email="ann@example.com")
+        AuthorProfile.objects.create(author=author, city="Москва")
+        Tag.objects.create(name="Лишний", slug_name="lishniy")
+        tags = [Tag.objects.create(name=name, slug_name=slug) for name, slug in [("Горы", "gory"), ("Море", "more")]]
+        post = Entry.objects.create(blog=blog, author=author, headline="Статья", body_text="Текст", rating=4.5,
+                                    pub_date=timezone.make_aware(datetime(2024, 5, 1, 10, 0)))
+        post.tags.set(tags)
+
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                call_command('dump_alter_data', self.path(fmt), format=fmt, chunk_size=1, stdout=io.StringIO())
+                self.assertEqual(list(iter_records(os.path.join(self.path(fmt), f"entrys.{fmt}"))),
+                                 [{"blog": "Блог", "headline": "Статья", "body_text": "Текст",
+                                   "pub_date": "2024-05-01 10:00:00",
+                                   "author": "ann", "number_of_comments": 0, "number_of_pingbacks": 0,
+                                   "rating": 4.5, "tags": [2, 3]}])
 
-# Create your tests here.
+        # Выгрузка читается обратно командой load_alter_data
+        dumped = {name: list(iter_records(os.path.join(self.path(JSONL), f"{name}.{JSONL}")))
+                  for name in ('blogs', 'authors', 'authors_profile', 'tags', 'entrys')}
+        for model in (Entry, AuthorProfile, Author, Blog, Tag):
+            model.objects.all().delete()
+        call_command('load_alter_data', self.path(JSONL), format=JSONL, stdout=io.StringIO())
+        loaded = Entry.objects.get()
+        self.assertEqual((loaded.blog.name, loaded.author.name, loaded.rating), ("Блог", "ann", 4.5))
+        self.assertEqual(sorted(loaded.tags.values_list('name', flat=True)), ["Горы", "Море"])
+        self.assertEqual(AuthorProfile.objects.get().city, "Москва")
+        self.assertEqual(len(dumped['tags']), 3)
@@ -1,10 +1,11 @@
-from django.http import JsonResponse
 from django.views import View
 from .models import Author
 from django.views.decorators.csrf import csrf_exempt
 import json
 from django.shortcuts import render
 
+from apps.app.responses import json_response
+
 
 class AuthorREST(View):
 
@@ -32,15 +33,10 @@ class AuthorREST(View):
                         'email': author.email}
             else:  # Иначе, так как автор не найден (QuerySet пустой), то возвращаем ошибку, с произвольным текстом,
                 # для понимания почему произошла ошибка
-                return JsonResponse({'error': f'Автора с id={id} не найдено!'},
-                                    status=404,
-                                    json_dumps_params={"ensure_ascii": False,
-                                                       "indent": 4}
-                                    )
+                return json_response(request, {'error': f'Автора с id={id} не найдено!'}, status=404)
 
         # После того как данные для ответа созданы - возвращаем Json объект с данными
-        return JsonResponse(data, safe=False, json_dumps_params={"ensure_ascii": False,
-                                                                 "indent": 4})
+        return json_response(request, data)
 
     def post(self, request):
         try:
@@ -56,15 +52,9 @@ class AuthorREST(View):
                 'name': author.name,
                 'email': author.email
             }
-            return JsonResponse(response_data, status=201,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4}
-                                )
+            return json_response(request, response_data, status=201)
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=400,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4}
-                                )
+            return json_response(request, {'error': str(e)}, status=400)
 
     def put(self, request, id):
         try:
@@ -82,22 +72,11 @@ class AuthorREST(View):
                 'name': author.name,
                 'email': author.email
             }
-            return JsonResponse(response_data,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, response_data)
         except Author.DoesNotExist:  # Если получили ошибку
-            return JsonResponse({'error': 'Автор не найден'},
-                                status=404,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, {'error': 'Автор не найден'}, status=404)
         except Exception as e:  # При любой другой ошибке
-            return JsonResponse({'error': str(e)},
-                                status=400,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, {'error': str(e)}, status=400)
     def patch(self, request, id):
         try:
             author = Author.objects.get(id=id)  # Получаем объект
@@ -113,40 +92,18 @@ class AuthorREST(View):
                 'name': author.name,
                 'email': author.email
             }
-            return JsonResponse(response_data,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, response_data)
         except Author.DoesNotExist:
-            return JsonResponse({'error': f'Автор с id={author.id} не найден'},
-                                status=404,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, {'error': f'Автор с id={author.id} не найден'}, status=404)
         except Exception as e:
-            return JsonResponse({'error': str(e)},
-                                status=400,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, {'error': str(e)}, status=400)
 
     def delete(self, request, id):
         try:
             author = Author.objects.get(id=id)
             author.delete()
-            return JsonResponse({'message': 'Автор успешно удалён'},
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, {'message': 'Автор успешно удалён'})
         except Author.DoesNotExist:
-            return JsonResponse({'error': 'Автор не найден'},
-                                status=404,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, {'error': 'Автор не найден'}, status=404)
         except Exception as e:
-            return JsonResponse({'error': str(e)},
-                                status=400,
-                                json_dumps_params={"ensure_ascii": False,
-                                                   "indent": 4},
-                                )
+            return json_response(request, {'error': str(e)}, status=400)
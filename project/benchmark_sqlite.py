@@ -0,0 +1,103 @@
+"""
+Сравнение профилей SQLite (SQLITE_PROFILES в settings.py) под параллельной нагрузкой.
+
+Каждый профиль проверяется на своей временной БД, рабочая db.sqlite3 не затрагивается.
+Потоки в течение заданного времени выполняют смесь операций:
+- чтение: выборка последних записей (как лента статей);
+- запись в transaction.atomic(): чтение счётчика, вставка строки и обновление счётчика
+  (как добавление комментария с пересчётом number_of_comments).
+Результат - число операций в секунду и число ошибок "database is locked".
+
+Запуск из корня проекта: python -m project.benchmark_sqlite --threads 8 --seconds 5 --writes 0.2
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+
+from project.settings import SQLITE_PROFILES
+
+
+def configure(directory, profiles):
+    databases = {name: {'ENGINE': 'project.sqlite_backend',
+                        'NAME': os.path.join(directory, f'{name}.sqlite3'),
+                        'OPTIONS': SQLITE_PROFILES[name]} for name in profiles}
+    databases['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}  # Обязательна, не используется
+    settings.configure(USE_TZ=True, DATABASES=databases)
+    django.setup()
+
+
+def prepare(alias, rows=1000):
+    with connections[alias].cursor() as cursor:
+        cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, body TEXT NOT NULL, created REAL NOT NULL)")
+        cursor.execute("CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)")
+        cursor.execute("INSERT INTO counter (id, value) VALUES (1, 0)")
+        cursor.executemany("INSERT INTO item (body, created) VALUES (%s, %s)",
+                           [('x' * 200, time.time()) for _ in range(rows)])
+    connections[alias].close()
+
+
+def worker(alias, deadline, write_ratio, stats, lock):
+    done = errors = 0
+    rnd = random.Random()
+    connection = connections[alias]  # Своё соединение у каждого потока, живёт до конца замера
+    try:
+        while time.monotonic() < deadline:
+            try:
+                if rnd.random() < write_ratio:
+                    with transaction.atomic(using=alias), connection.cursor() as cursor:
+                        cursor.execute("SELECT value FROM counter WHERE id = 1")
+                        value = cursor.fetchone()[0]
+                        cursor.execute("INSERT INTO item (body, created) VALUES (%s, %s)", ('y' * 200, time.time()))
+                        cursor.execute("UPDATE counter SET value = %s WHERE id = 1", (value + 1,))
+                else:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT id, body FROM item ORDER BY id DESC LIMIT 20")
+                        cursor.fetchall()
+                done += 1
+            except OperationalError:  # database is locked
+                errors += 1
+    finally:
+        connection.close()
+    with lock:
+        stats['ops'] += done
+        stats['errors'] += errors
+
+
+def run(alias, threads, seconds, write_ratio):
+    stats = {'ops': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    pool = [threading.Thread(target=worker, args=(alias, deadline, write_ratio, stats, lock))
+            for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочное сравнение профилей SQLite")
+    parser.add_argument('--threads', type=int, default=8, help="Параллельных потоков")
+    parser.add_argument('--seconds', type=float, default=5, help="Длительность замера для профиля")
+    parser.add_argument('--writes', type=float, default=0.2, help="Доля пишущих операций, от 0 до 1")
+    parser.add_argument('--profiles', nargs='+', default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure(directory, args.profiles)
+        for alias in args.profiles:
+            prepare(alias)
+            stats = run(alias, args.threads, args.seconds, args.writes)
+            print(f"{alias:>8}: {stats['ops'] / args.seconds:10.1f} оп/с, ошибок блокировки: {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
 """
 Конвертация данных в json
+
+Файлы пишутся по одной записи через apps/db_train_alternative/streaming.py (без dump всего списка).
+Запуск из корня проекта: python -m project.convert_data_alter_to_json
 """
+import os
+
+from apps.db_train_alternative.streaming import write_records
 
 data_blog = [
     {"name": "Путешествия по миру",
@@ -624,22 +630,12 @@ data_tag = [
     },
 ]
 
-if __name__ == "__main__":
-    from json import dump
-    import os
 
-    if not os.path.exists("data"):
-        os.mkdir("data")
-    if not os.path.exists("data/alter"):
-        os.mkdir("data/alter")
+if __name__ == "__main__":
+    os.makedirs("data/alter", exist_ok=True)
 
-    with open("data/alter/blogs.json", "w", encoding="utf-8") as f:
-        dump(data_blog, f, ensure_ascii=False, indent=4)
-    with open("data/alter/authors.json", "w", encoding="utf-8") as f:
-        dump(data_author, f, ensure_ascii=False, indent=4)
-    with open("data/alter/authors_profile.json", "w", encoding="utf-8") as f:
-        dump(data_author_profile, f, ensure_ascii=False, indent=4)
-    with open("data/alter/entrys.json", "w", encoding="utf-8") as f:
-        dump(data_entry, f, ensure_ascii=False, indent=4)
-    with open("data/alter/tags.json", "w", encoding="utf-8") as f:
-        dump(data_tag, f, ensure_ascii=False, indent=4)
+    write_records("data/alter/blogs.json", data_blog)
+    write_records("data/alter/authors.json", data_author)
+    write_records("data/alter/authors_profile.json", data_author_profile)
+    write_records("data/alter/entrys.json", data_entry)
+    write_records("data/alter/tags.json", data_tag)
@@ -0,0 +1,175 @@
+"""
+Учёт запросов к БД на каждый HTTP запрос: бюджет запросов на view и поиск N+1.
+
+QueryBudgetMiddleware через connection.execute_wrapper считает запросы и время БД, пока
+обрабатывается запрос, включая рендеринг шаблонов. Накладные расходы - замер времени
+и запись в словарь на каждый SQL запрос, поэтому middleware можно держать включённым
+в продакшене (в отличие от debug_toolbar).
+
+- Бюджет: QUERY_BUDGETS = {'app:index': 10, ...} по имени маршрута (namespace:name),
+  для остальных - QUERY_BUDGET_DEFAULT (None - без ограничения). Бюджет задаёт число запросов
+  на чтение страницы, поэтому проверяется только для GET и HEAD: изменение (проверка формы,
+  сохранение, связи многие-ко-многим) обходится дороже, для него остаётся только поиск N+1.
+- N+1: один и тот же "вид" SQL (текст с плейсхолдерами, списки IN (...) схлопываются)
+  повторился QUERY_REPEAT_THRESHOLD и более раз.
+- QUERY_BUDGET_MODE: 'warn' - запись в лог, 'raise' - исключение QueryBudgetExceeded
+  (включается в тестах, см. project/test_runner.py), 'off' - только статистика.
+- Middleware стоит в MIDDLEWARE после debug_toolbar: запросы самой панели не учитываются.
+- Гистограммы числа запросов и времени БД по маршрутам накапливаются в памяти процесса
+  и отдаются в текстовом формате Prometheus view query_metrics (только персоналу сайта).
+- QUERY_BUDGET_SERVER_TIMING: заголовок Server-Timing с временем БД (видно в DevTools).
+- QUERY_BUDGET_EXEMPT_PATHS: префиксы путей, запросы которых не учитываются (админка, debug_toolbar).
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+_IN_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+BUDGET_METHODS = ('GET', 'HEAD')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def sql_shape(sql):
+    """Вид запроса: текст без значений, список плейсхолдеров любой длины - как один"""
+    return _IN_LIST.sub('%s, ...', sql)
+
+
+class QueryStats:
+    """Запросы одного HTTP запроса. Вызывается как execute_wrapper"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # Секунды
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        """Виды запросов, повторившиеся threshold и более раз: [(sql, количество)]"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+class Histogram:
+    """Накопительная гистограмма в формате Prometheus: счётчики по верхним границам, сумма и количество"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)  # Последний - +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, bucket in zip((*self.bounds, '+Inf'), self.buckets):
+            cumulative += bucket
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {round(self.total, 3)}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+_histograms = {}  # view -> (запросы, время БД в мс)
+_histograms_lock = threading.Lock()
+
+
+def observe(view, stats):
+    with _histograms_lock:
+        if view not in _histograms:
+            _histograms[view] = (Histogram(QUERY_BUCKETS), Histogram(TIME_BUCKETS_MS))
+        queries, duration = _histograms[view]
+        queries.observe(stats.count)
+        duration.observe(stats.duration * 1000)
+
+
+def export_metrics():
+    """Гистограммы всех маршрутов в текстовом формате Prometheus"""
+    lines = ['# TYPE http_view_db_queries histogram', '# TYPE http_view_db_time_ms histogram']
+    with _histograms_lock:
+        for view, (queries, duration) in sorted(_histograms.items()):
+            labels = f'view="{view}"'
+            lines.extend(queries.lines('http_view_db_queries', labels))
+            lines.extend(duration.lines('http_view_db_time_ms', labels))
+    return "\n".join(lines) + "\n"
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'  # 404 до выбора view, статика
+    return match.view_name or match._func_path
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, 'QUERY_BUDGET_MODE', 'warn')
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        self.repeat_threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        self.server_timing = getattr(settings, 'QUERY_BUDGET_SERVER_TIMING', False)
+        self.exempt_paths = tuple(getattr(settings, 'QUERY_BUDGET_EXEMPT_PATHS', ()))
+
+    def __call__(self, request):
+        if self.exempt_paths and request.path.startswith(self.exempt_paths):
+            return self.get_response(request)
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+
+        view = view_name(request)
+        observe(view, stats)
+        if self.server_timing:
+            response.headers['Server-Timing'] = (f'db;dur={stats.duration * 1000:.1f};'
+                                                 f'desc="{stats.count} queries"')
+        if self.mode != 'off':
+            self.check(request, view, stats)
+        return response
+
+    def check(self, request, view, stats):
+        problems = []
+        budget = self.budgets.get(view, self.default_budget) if request.method in BUDGET_METHODS else None
+        if budget is not None and stats.count > budget:
+            problems.append(f"{stats.count} запросов при бюджете {budget}")
+        for shape, count in stats.repeated(self.repeat_threshold):
+            problems.append(f"N+1: {count} раз {shape}")
+        if not problems:
+            return
+        message = f"{request.method} {request.path} ({view}): " + "; ".join(problems)
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def query_metrics(request):
+    """Гистограммы запросов к БД по маршрутам (формат Prometheus), только для персонала сайта"""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(export_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -78,6 +78,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    # После debug_toolbar: его запросы (панели, сохранение статистики) не попадают в бюджет. Сессия и
+    # пользователь загружаются лениво при первом обращении во view или шаблоне, поэтому учитываются
+    'project.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'project.urls'
@@ -104,10 +107,62 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Профиль SQLite задаётся переменной окружения SQLITE_PROFILE (см. project/sqlite_backend):
+#   plain - настройки SQLite по умолчанию (журнал отката, BEGIN DEFERRED), по умолчанию
+#   tuned - WAL, synchronous=NORMAL, mmap и кэш страниц, ожидание блокировки, BEGIN IMMEDIATE.
+#           Режим WAL записывается в заголовок файла БД, поэтому включается явно (SQLITE_PROFILE=tuned)
+#           на сервере, а не при каждом запуске из репозитория с db.sqlite3
+# Сравнение профилей под параллельной нагрузкой: python -m project.benchmark_sqlite
+
+SQLITE_PROFILES = {
+    'plain': {},
+    'tuned': {
+        'timeout': 20,  # Секунд ожидания снятия блокировки (busy timeout) вместо ошибки "database is locked"
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {
+            'journal_mode': 'wal',  # Читатели не блокируют писателя и наоборот
+            'synchronous': 'normal',  # В режиме WAL не теряет целостность, fsync только при checkpoint
+            'mmap_size': 128 * 1024 * 1024,
+            'cache_size': -32 * 1024,  # Отрицательное значение - в КиБ, т.е. 32 МиБ на соединение
+            'temp_store': 'memory',
+        },
+    },
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'project.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_PROFILES[os.getenv('SQLITE_PROFILE', 'plain')],
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),  # Секунд жизни соединения, 0 - новое на каждый запрос
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Отдельный кэш 'sidebar' для данных боковой панели (список блогов, теги, свежие записи).
+# Бэкенд задаётся переменной окружения SIDEBAR_CACHE_BACKEND:
+#   locmem - память процесса (по умолчанию, у каждого процесса свой кэш)
+#   file   - файлы на диске, общий для всех процессов на одной машине
+#   redis  - локальный Redis-совместимый сервер (нужен пакет redis)
+
+SIDEBAR_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'sidebar'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache', 'sidebar')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+_sidebar_backend, _sidebar_location = SIDEBAR_CACHE_BACKENDS[os.getenv('SIDEBAR_CACHE_BACKEND', 'locmem')]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sidebar': {
+        'BACKEND': _sidebar_backend,
+        'LOCATION': os.getenv('SIDEBAR_CACHE_LOCATION', _sidebar_location),
+        'TIMEOUT': int(os.getenv('SIDEBAR_CACHE_TIMEOUT', 600)),  # Страховка на случай пропущенной инвалидации
     },
 }
 
@@ -157,6 +212,16 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # Место для хранения (на сервере) медиафайлов
 
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))  # Потоков для обработки картинок в фоне (0 - обработка сразу), см. apps/app/images.py
+THUMBNAIL_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'thumbnails')  # Копии картинок статей для srcset
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# JSON ответы EntryJson и AuthorREST (apps/app/responses.py):
+#   orjson - быстрый кодировщик (нужен пакет orjson, без него используется json)
+#   json   - стандартная библиотека
+JSON_ENCODER_BACKEND = os.getenv('JSON_ENCODER_BACKEND', 'orjson')
+JSON_COMPRESS_MIN_LENGTH = 512  # Ответы короче не сжимаются (br нужен пакет brotli, иначе gzip)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -171,4 +236,21 @@ mimetypes.add_type("application/javascript", ".js", True)
 
 DEBUG_TOOLBAR_CONFIG = {
     "INTERCEPT_REDIRECTS": False,
-}
\ No newline at end of file
+}
+
+# Бюджет запросов к БД на view и поиск N+1 (см. project/query_budget.py)
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'warn')  # off, warn, raise (в тестах - raise, см. TEST_RUNNER)
+QUERY_BUDGET_DEFAULT = None  # Для маршрутов не из QUERY_BUDGETS, None - без ограничения
+QUERY_BUDGETS = {
+    'app:index': 10,
+    'app:blog': 10,
+    'app:post-detail': 12,
+    'app:search': 10,
+    'app:entry': 6,
+    'app:entry-search': 6,
+}
+QUERY_REPEAT_THRESHOLD = 5  # Столько одинаковых по виду запросов - признак N+1
+QUERY_BUDGET_SERVER_TIMING = DEBUG  # Заголовок Server-Timing с временем БД
+QUERY_BUDGET_EXEMPT_PATHS = ('/admin/', '/__debug__/')  # Без учёта: списки админки - не страницы сайта
+
+TEST_RUNNER = 'project.test_runner.QueryBudgetTestRunner'
@@ -0,0 +1,37 @@
+"""
+Бэкенд SQLite с настройкой соединения при подключении (ENGINE = 'project.sqlite_backend').
+
+Дополнительные ключи OPTIONS (остальные, например timeout, передаются в sqlite3.connect):
+- pragmas: словарь PRAGMA, выполняемых на каждом новом соединении, например
+  {'journal_mode': 'wal', 'synchronous': 'normal'};
+- transaction_mode: 'DEFERRED' (по умолчанию, как в стандартном бэкенде), 'IMMEDIATE'
+  или 'EXCLUSIVE' - режим BEGIN для transaction.atomic().
+
+IMMEDIATE берёт блокировку записи в начале транзакции. При DEFERRED транзакция, которая
+сначала читает, а потом пишет, при встрече с другой такой же получает "database is
+locked" сразу, без ожидания timeout: SQLite не может повысить блокировку у обеих.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', 'DEFERRED').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode должен быть одним из {', '.join(TRANSACTION_MODES)}")
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
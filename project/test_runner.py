@@ -0,0 +1,19 @@
+"""
+Запуск тестов (TEST_RUNNER в settings.py): на время тестов QUERY_BUDGET_MODE = 'raise',
+превышение бюджета запросов или N+1 на странице - ошибка теста (см. project/query_budget.py).
+Отдельные тесты могут переопределить режим через override_settings.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_settings = override_settings(QUERY_BUDGET_MODE='raise')
+        self.query_budget_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budget_settings.disable()
+        super().teardown_test_environment(**kwargs)